@@ -1,69 +1,126 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from itertools import permutations
-
-# Логика солвера
-class Solver:
-    def __init__(self, func, part_table):
-        '''
-        :param func - evalable str with variables x, y, z, w and logic elements "==", "not", "()", "<=", "and", "or":
-        example: "(x <= y) and (y or z) or (not w == x)"
-        :param part_table: matrix 3 by 4. with lists of ints and Nones, like this:
-        [
-        [0, 1, None, None, 0],
-        [None, 0, 0, 0, 0],
-        [0, None, 1, None, 0]
-        ]
-        '''
-        func = func.replace('∨', ' or ').replace('≡', '==').replace('¬', ' not ').replace('∧', ' and ').replace('→',
-                                                                                                                '<=')
-        self.func = func
-        self.part_table = [i for i in part_table]
-        self.table = []
-        self.table_needed = []
-
-    def create_whole_table(self):
-        if self.table:
-            return self.table
-        for x in range(2):
-            for y in range(2):
-                for z in range(2):
-                    for w in range(2):
-                        self.table.append([x, y, z, w, int(eval(self.func))])
-        return self.table
-
-    def solve(self):
-        indexes = [0, 1, 2, 3]
-        if not self.table:
-            self.create_whole_table()
-        for tble in permutations(self.table, r=3):
-            for index in permutations(indexes):
-                flag = False
-                for i in range(3):
-                    for j in range(4):
-                        if tble[i][index[j]] != self.part_table[i][j] and self.part_table[i][j] is not None:
-                            flag = True
-                            break
-                    if flag or tble[i][-1] != self.part_table[i][-1]:
-                        break
-                else:
-                    m = [i for i in index]
-                    m.append(-1)
-                    return index, [[j[i] for i in m] for j in tble]
-        return -1
+import queue
+import threading
+import time
 
-    def new_value(self, func, part_table):
-        func = func.replace('∨', ' or ').replace('≡', '==').replace('¬', ' not ').replace('∧', ' and ').replace('→',
-                                                                                                                '<=')
-        self.func = func
-        self.part_table = [i for i in part_table]
-        self.table = []
-        self.table_needed = []
+from formula import row_values
+from solver import VARIABLES, Solver, SolverCancelled
 
 
 # Интерфейс на tkinter
 
+class VirtualTable:
+    """
+    Таблица истинности, где строки Treeview есть только у видимой части.
+    Значения строк считаются из упакованного столбца F при прокрутке.
+    """
+    ROW_HEIGHT = 20
+    HEADER_HEIGHT = 24
+
+    def __init__(self, master):
+        frame = tk.Frame(master)
+        frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        ttk.Style().configure("Truth.Treeview", rowheight=self.ROW_HEIGHT)
+        self.tree = ttk.Treeview(frame, show="headings", selectmode="none", style="Truth.Treeview")
+        self.tree.tag_configure("match", background="#fff3b0")
+        self.scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_wheel)
+        self.tree.bind("<Button-4>", self.on_wheel)
+        self.tree.bind("<Button-5>", self.on_wheel)
+
+        self.variables = ()
+        self.packed = 0
+        self.total = 0
+        self.first = 0
+        self.visible = 1
+        self.marked = 0
+
+    def set_table(self, variables, packed):
+        self.variables = tuple(variables)
+        self.packed = packed
+        self.total = 1 << len(self.variables)
+        self.first = 0
+        self.marked = 0
+        self.set_columns(self.variables)
+        self.refresh()
+
+    def set_columns(self, variables):
+        columns = tuple(variables) + ("F",)
+        self.tree.configure(columns=columns)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=40, anchor="center")
+
+    def row_values(self, r):
+        return row_values(r, len(self.variables)) + [(self.packed >> r) & 1]
+
+    def refresh(self):
+        count = max(0, min(self.visible, self.total - self.first))
+        items = list(self.tree.get_children())
+        # Строки Treeview переиспользуются, меняются только значения
+        while len(items) < count:
+            items.append(self.tree.insert("", tk.END))
+        for item in items[count:]:
+            self.tree.delete(item)
+        for i, item in enumerate(items[:count]):
+            r = self.first + i
+            self.tree.item(item, values=self.row_values(r), tags=("match",) if (self.marked >> r) & 1 else ())
+        if self.total:
+            self.scrollbar.set(self.first / self.total, (self.first + count) / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll_to(self, first):
+        self.first = max(0, min(first, self.total - self.visible))
+        self.refresh()
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.total))
+        else:
+            step = int(amount) * (self.visible if unit == "pages" else 1)
+            self.scroll_to(self.first + step)
+
+    def on_wheel(self, event):
+        up = event.num == 4 or event.delta > 0
+        self.scroll_to(self.first + (-3 if up else 3))
+        return "break"
+
+    def on_resize(self, event):
+        visible = max(1, (event.height - self.HEADER_HEIGHT) // self.ROW_HEIGHT)
+        if visible != self.visible:
+            self.visible = visible
+            self.scroll_to(self.first)
+
+    def mark(self, mask):
+        """Подсвечивает строки из маски и прокручивает к первой из них"""
+        self.marked = mask
+        if mask:
+            self.scroll_to((mask & -mask).bit_length() - 1 - self.visible // 2)
+        else:
+            self.refresh()
+
+    def show_next_mark(self):
+        """Прокручивает к следующей подсвеченной строке после видимых, по кругу"""
+        if not self.marked:
+            return
+        start = self.first + self.visible // 2 + 1
+        rest = self.marked >> start
+        r = start + (rest & -rest).bit_length() - 1 if rest else (self.marked & -self.marked).bit_length() - 1
+        self.scroll_to(r - self.visible // 2)
+
+
 class SolverApp:
+    POLL_MS = 50
+    TIME_BUDGET = 10
+    # пауза после последнего нажатия клавиши перед решением при вводе, мс
+    LIVE_DELAY_MS = 300
+
     def __init__(self, root):
         self.root = root
         self.root.title("ЕГЭ Информатика №2 Solver")
@@ -77,6 +134,7 @@ class SolverApp:
         self.func_entry = tk.Entry(top_frame, font=("Courier", 12))
         self.func_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=10)
         self.func_entry.insert(0, "(x or y) and not (y == z) and not w")
+        self.func_entry.bind("<KeyRelease>", self.on_edit)
 
         main_frame = tk.Frame(root)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -85,18 +143,10 @@ class SolverApp:
         left_frame = tk.LabelFrame(main_frame, text="Полная таблица истинности", padx=5, pady=5)
         left_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        columns = ("x", "y", "z", "w", "F")
-        self.tree = ttk.Treeview(left_frame, columns=columns, show="headings")
-
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=40, anchor="center")
-
-        scrollbar = ttk.Scrollbar(left_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set)
-
-        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.table_view = VirtualTable(left_frame)
+        self.table_view.set_columns(VARIABLES)
+        tk.Button(left_frame, text="К совпадениям с фрагментом ▼",
+                  command=self.table_view.show_next_mark).pack(side=tk.BOTTOM, fill=tk.X, pady=(5, 0))
 
         # Фрагмент таблицы истинности
         right_frame = tk.LabelFrame(main_frame, text="Фрагмент таблицы (ввод)", padx=5, pady=5)
@@ -113,11 +163,16 @@ class SolverApp:
                 self.header_labels.append(lbl)
 
         self.entries = []
+        # клетки, дозаполненные решателем: при вводе они не считаются данными пользователя
+        self.filled_cells = set()
+        self.cell_of = {}
         for r in range(3):
             row_entries = []
             for c in range(5):
                 entry = tk.Entry(right_frame, width=5, justify="center", font=("Arial", 12))
                 entry.grid(row=r + 1, column=c, padx=3, pady=3)
+                entry.bind("<KeyRelease>", self.on_edit)
+                self.cell_of[entry] = (r, c)
                 row_entries.append(entry)
             self.entries.append(row_entries)
 
@@ -129,21 +184,75 @@ class SolverApp:
                               font=("Arial", 12, "bold"), command=self.run_solver)
         solve_btn.pack(side=tk.LEFT, padx=20)
 
+        self.cancel_btn = tk.Button(bottom_frame, text="ОТМЕНА", font=("Arial", 12),
+                                    command=self.cancel_solver, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT, padx=(0, 20))
+
+        self.live_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(bottom_frame, text="Решать при вводе", variable=self.live_var,
+                       font=("Arial", 12)).pack(side=tk.LEFT, padx=(0, 20))
+
+        tk.Label(bottom_frame, text="Лимит, с:", font=("Arial", 12)).pack(side=tk.LEFT)
+        self.budget_var = tk.StringVar(value=str(self.TIME_BUDGET))
+        tk.Spinbox(bottom_frame, from_=1, to=3600, width=5, textvariable=self.budget_var,
+                   font=("Arial", 12)).pack(side=tk.LEFT, padx=(5, 20))
+
         tk.Label(bottom_frame, text="Ответ:", font=("Arial", 12)).pack(side=tk.LEFT)
         self.result_var = tk.StringVar()
         result_entry = tk.Entry(bottom_frame, textvariable=self.result_var,
                                 font=("Arial", 14, "bold"), fg="blue", state="readonly", width=10)
         result_entry.pack(side=tk.LEFT, padx=10)
 
-    def get_partial_table_data(self):
-        """Считывает данные из правой таблицы. Пустые клетки -> None"""
+        self.status_var = tk.StringVar()
+        tk.Label(bottom_frame, textvariable=self.status_var, font=("Arial", 10), fg="gray").pack(side=tk.LEFT)
+
+        # Решение идёт в фоновом потоке, окно опрашивает очередь сообщений через root.after
+        self.messages = queue.Queue()
+        self.job = 0
+        self.cancel_event = None
+        # отложенное решение при вводе и последний решатель: его таблица нужна, пока функция не менялась
+        self.live_after = None
+        self.last_solver = None
+        self.shown_table = None
+
+    def on_edit(self, event):
+        """Правка функции или клетки: решение запускается, когда ввод на LIVE_DELAY_MS затих"""
+        if not event.char and event.keysym not in ("BackSpace", "Delete"):
+            # стрелки, Tab и т.п. текст не меняют
+            return
+        cell = self.cell_of.get(event.widget)
+        if cell is not None and event.char:
+            # дозаполненная клетка, в которой набрали значение, становится клеткой пользователя
+            self.filled_cells.discard(cell)
+            event.widget.config(fg="black")
+        if not self.live_var.get():
+            return
+        if self.live_after is not None:
+            self.root.after_cancel(self.live_after)
+        self.live_after = self.root.after(self.LIVE_DELAY_MS, self.run_solver, True)
+
+    def clear_filled_cells(self):
+        for r, c in self.filled_cells:
+            self.entries[r][c].delete(0, tk.END)
+            self.entries[r][c].config(fg="black")
+        self.filled_cells.clear()
+
+    def show_error(self, live, title, text):
+        """При вводе ошибки идут в строку состояния: окно на каждое нажатие мешало бы печатать"""
+        if live:
+            self.status_var.set(text.replace("\n", " "))
+        else:
+            messagebox.showerror(title, text)
+
+    def get_partial_table_data(self, live=False):
+        """Считывает данные из правой таблицы. Пустые и дозаполненные решателем клетки -> None"""
         data = []
         try:
-            for row in self.entries:
+            for r, row in enumerate(self.entries):
                 row_data = []
-                for entry in row:
+                for c, entry in enumerate(row):
                     val = entry.get().strip()
-                    if val == "":
+                    if val == "" or (r, c) in self.filled_cells:
                         row_data.append(None)
                     elif val in ["0", "1"]:
                         row_data.append(int(val))
@@ -151,57 +260,136 @@ class SolverApp:
                         raise ValueError("Вводите только 0 или 1")
                 data.append(row_data)
         except ValueError as e:
-            messagebox.showerror("Ошибка ввода", str(e))
+            self.show_error(live, "Ошибка ввода", str(e))
             return None
         return data
 
-    def run_solver(self):
+    def run_solver(self, live=False):
+        self.live_after = None
+        # Предыдущий поиск больше не нужен, его результат будет пропущен
+        self.cancel_solver()
+        self.cancel_event = None
+        self.cancel_btn.config(state=tk.DISABLED)
+        self.job += 1
+        self.status_var.set("")
+        self.result_var.set("")
+        self.clear_filled_cells()
+
         # Сброс заголовков на "?" перед новым решением
         for lbl in self.header_labels:
             lbl.config(text="?", fg="black")
 
         func_str = self.func_entry.get()
-        part_table = self.get_partial_table_data()
+        part_table = self.get_partial_table_data(live)
 
         if part_table is None:
             return
 
         try:
-            solver = Solver(func_str, part_table)
+            budget = float(self.budget_var.get())
+        except ValueError:
+            self.show_error(live, "Ошибка ввода", "Лимит времени - число секунд")
+            return
+
+        try:
+            if self.last_solver is not None and self.last_solver.func == func_str:
+                # менялись только клетки фрагмента - таблица и сигнатуры столбцов уже посчитаны
+                solver = self.last_solver.with_fragment(part_table)
+            else:
+                solver = Solver(func_str, part_table)
+        except Exception as e:
+            self.show_error(live, "Ошибка выполнения", f"Произошла ошибка:\n{e}\nПроверьте синтаксис функции.")
+            return
+        self.last_solver = solver
+
+        cancel = self.cancel_event = threading.Event()
+        started = time.monotonic()
+        solver.should_stop = lambda: cancel.is_set() or time.monotonic() - started > budget
 
-            # Заполняем полную таблицу истинности
-            full_table = solver.create_whole_table()
-            self.populate_left_table(full_table)
+        self.result_var.set("")
+        self.status_var.set("Поиск...")
+        self.cancel_btn.config(state=tk.NORMAL)
+        threading.Thread(target=self.solve_in_background, args=(self.job, solver), daemon=True).start()
+        self.root.after(self.POLL_MS, self.poll_solver, self.job, solver, started, live)
 
-            # Решаем
+    def solve_in_background(self, job, solver):
+        """Работает в фоновом потоке: виджеты не трогает, только кладёт сообщения в очередь"""
+        try:
+            # Строки таблицы не строятся: окно показывает их из упакованного столбца F
+            self.messages.put((job, "table", (solver.variables, solver.create_packed_table())))
             result = solver.solve()
+            matches = 0 if result == -1 else solver.rows_for(*result)
+            self.messages.put((job, "result", (result, matches)))
+        except SolverCancelled:
+            self.messages.put((job, "cancelled", None))
+        except Exception as e:
+            self.messages.put((job, "error", e))
 
-            if result == -1:
-                self.result_var.set("Нет реш.")
-                messagebox.showwarning("Результат", "Решение не найдено. Проверьте функцию или таблицу.")
+    def poll_solver(self, job, solver, started, live=False):
+        # опрос прерванного поиска завершается сам и не забирает сообщения нового
+        if job != self.job:
+            return
+        while True:
+            try:
+                msg_job, kind, payload = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            # сообщения от прерванных поисков пропускаем
+            if msg_job != job:
+                continue
+            if kind == "table":
+                self.populate_left_table(*payload)
             else:
-                indices, filled_rows = result
+                self.finish_solver(solver, kind, payload, time.monotonic() - started, live)
+                return
+        self.status_var.set(f"Поиск... {solver.progress} вариантов, {time.monotonic() - started:.1f} с")
+        self.root.after(self.POLL_MS, self.poll_solver, job, solver, started, live)
+
+    def finish_solver(self, solver, kind, payload, elapsed, live=False):
+        self.cancel_btn.config(state=tk.DISABLED)
+        cancelled = self.cancel_event.is_set()
+        self.cancel_event = None
+        if kind == "cancelled":
+            self.result_var.set("")
+            self.status_var.set("Отменено" if cancelled else f"Время вышло ({elapsed:.1f} с)")
+            return
+        if kind == "error":
+            self.status_var.set("")
+            self.show_error(live, "Ошибка выполнения", f"Произошла ошибка:\n{payload}\nПроверьте синтаксис функции.")
+            return
 
-                vars_map = ['x', 'y', 'z', 'w']
-                answer_str = "".join([vars_map[i] for i in indices])
-                self.result_var.set(answer_str)
+        self.status_var.set(f"Готово за {elapsed:.2f} с")
+        payload, matches = payload
+        self.table_view.mark(matches)
+        if payload == -1:
+            self.result_var.set("Нет реш.")
+            if not live:
+                messagebox.showwarning("Результат", "Решение не найдено. Проверьте функцию или таблицу.")
+        else:
+            indices, filled_rows = payload
 
-                # Дозаполняем правую таблицу
-                self.update_right_table(filled_rows)
+            vars_map = solver.variables
+            answer_str = "".join([vars_map[i] for i in indices])
+            self.result_var.set(answer_str)
 
-                # Обновляем заголовки
-                for i, var_idx in enumerate(indices):
-                    letter = vars_map[var_idx]
-                    self.header_labels[i].config(text=letter, fg="blue")
+            # Дозаполняем правую таблицу
+            self.update_right_table(filled_rows)
 
-        except Exception as e:
-            messagebox.showerror("Ошибка выполнения", f"Произошла ошибка:\n{e}\nПроверьте синтаксис функции.")
+            # Обновляем заголовки
+            for i, var_idx in enumerate(indices):
+                letter = vars_map[var_idx]
+                self.header_labels[i].config(text=letter, fg="blue")
 
-    def populate_left_table(self, data):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for row in data:
-            self.tree.insert("", tk.END, values=row)
+    def cancel_solver(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.status_var.set("Отмена...")
+
+    def populate_left_table(self, variables, packed):
+        # та же функция - таблица уже на экране, прокрутка не сбрасывается
+        if self.shown_table != (variables, packed):
+            self.shown_table = variables, packed
+            self.table_view.set_table(variables, packed)
 
     def update_right_table(self, filled_rows):
         for r, row_data in enumerate(filled_rows):
@@ -211,6 +399,7 @@ class SolverApp:
                 if current_val == "":
                     entry.insert(0, str(val))
                     entry.config(fg="red")
+                    self.filled_cells.add((r, c))
                 else:
                     entry.config(fg="black")
 
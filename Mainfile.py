@@ -13,14 +13,22 @@ for A in range(2):
         print(" ", A, "|", B, "|", int(elNot.Res))
 
 
+elA = logelement.TInput()
+elB = logelement.TInput()
 elNot1 = logelement.TNot()
 elNot2 = logelement.TNot()
 elAnd1 = logelement.TAnd()
 elAnd2 = logelement.TAnd()
 elOr = logelement.TOr()
 
+# выход входа схемы идёт сразу на несколько элементов
+elA.link(elNot2, 1) # -a
+elA.link(elAnd1, 1) # a и -b
+elB.link(elNot1, 1) # -b
+elB.link(elAnd2, 2) # -a и b
+
 elNot1.link(elAnd1, 2)
-elNot2.link(elAnd2, 1) 
+elNot2.link(elAnd2, 1)
 
 elAnd1.link(elOr, 1) # a и -b
 elAnd2.link(elOr, 2) # -a и b
@@ -31,8 +39,63 @@ print(" A | B | XOR ")
 print("-------------")
 for A in range(2):
     for B in range(2):
-        elNot2.In1 = bool(A) # -a
-        elAnd1.In1 = bool(A) # a и -b
-        elNot1.In1 = bool(B) # -b
-        elAnd2.In2 = bool(B) # -a и b
+        elA.In1 = bool(A)
+        elB.In1 = bool(B)
+        print(" ", A, "|", B, "|   ", int(elOr.Res))
+
+
+# Та же схема, собранная в плоскую схему по уровням (netlist.py): один проход без рекурсии
+import netlist
+
+circuit = netlist.Circuit([elA, elB, elNot1, elNot2, elAnd1, elAnd2, elOr])
+print("XOR (netlist), уровней:", circuit.depth)
+for A in range(2):
+    for B in range(2):
+        # входы схемы: elA.In1 = A, elB.In1 = B
+        circuit.run([A, B])
         print(" ", A, "|", B, "|   ", int(elOr.Res))
+
+# Вся таблица истинности за один бит-параллельный проход: бит r - строка r (A - старший бит)
+xor_column, = circuit.truth_table()
+print("XOR (бит-параллельно):", [(r >> 1, r & 1, xor_column >> r & 1) for r in range(4)])
+
+
+# Та же функция, собранная по формуле (circuit_builder.py): одинаковые подформулы - один элемент
+import circuit_builder
+
+builder = circuit_builder.CircuitBuilder(('A', 'B'))
+xor_net = builder.add("(A ∧ ¬B) ∨ (¬A ∧ B)")
+inputs, (elXor,) = builder.elements([xor_net])
+print("XOR (по формуле), элементов:", len(builder.store) - len(inputs))
+for A in range(2):
+    for B in range(2):
+        inputs['A'].In1 = bool(A)
+        inputs['B'].In1 = bool(B)
+        print(" ", A, "|", B, "|   ", int(elXor.Res))
+
+
+# Оптимизация схемы из элементов (circuit_opt.py): повторители, лишние отрицания и повторы убираются
+import circuit_opt
+
+opt_inputs, (opt_xor,), report = circuit_opt.optimize_elements([elA, elB, elNot1, elNot2, elAnd1, elAnd2, elOr])
+print(circuit_opt.format_report(report))
+
+
+# Готовые элементы: XOR одним элементом, многовходовые and/or, мультиплексор
+elX = logelement.TXor()
+elAll = logelement.TAnd(3)
+elMux = logelement.TMux()
+elA.link(elX, 1)
+elB.link(elX, 2)
+elA.link(elAll, 1)
+elB.link(elAll, 2)
+elX.link(elAll, 3)      # A и B и (A xor B) - всегда 0
+elA.link(elMux, 1)
+elB.link(elMux, 2)
+elX.link(elMux, 3)      # A xor B ? B : A
+print(" A | B | XOR | AND3 | MUX ")
+for A in range(2):
+    for B in range(2):
+        elA.In1 = bool(A)
+        elB.In1 = bool(B)
+        print(" ", A, "|", B, "|  ", int(elX.Res), "|  ", int(elAll.Res), " | ", int(elMux.Res))
@@ -0,0 +1,253 @@
+"""
+Заранее посчитанный индекс ответов для задач №2 с четырьмя переменными.
+
+Функций от четырёх переменных всего 2 ** 16. Функции, которые получаются друг из друга
+перестановкой переменных, хранятся одним классом (их 3984). Для представителя класса
+и каждого вида строки фрагмента (значение F и четыре клетки 0/1/пусто - 162 вида)
+хранится 24-битная маска подстановок столбцов, при которых в таблице есть такая строка.
+Подстановки пронумерованы в порядке itertools.permutations(range(4)).
+
+Файл: заголовок, номер класса (2 байта) и перестановка к представителю (1 байт) для каждой
+функции, затем маски классов по 3 байта. Файл открывается через mmap, целиком в память не читается.
+
+Построение: python answer_index.py build -o answers4.idx
+Проверка:   python answer_index.py check answers4.idx
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from itertools import permutations
+from multiprocessing import Pool
+
+from formula import row_values
+
+MAGIC = b'ANSIDX4\0'
+VERSION = 1
+HEADER = struct.Struct('<8sIIII')  # magic, версия, число классов, число видов строк, crc32 данных
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'answers4.idx')
+
+N = 4
+ROWS = 1 << N
+FUNCTIONS = 1 << ROWS
+PERMUTATIONS = list(permutations(range(N)))
+PATTERNS = 2 * 3 ** N
+
+
+class AnswerIndexError(ValueError):
+    """Файл индекса повреждён или другой версии"""
+
+
+def pattern_code(row):
+    """Номер вида строки фрагмента [c0, c1, c2, c3, F]; клетка: пусто - 0, ноль - 1, единица - 2"""
+    code = 0
+    for cell in reversed(row[:N]):
+        code = code * 3 + (0 if cell is None else cell + 1)
+    return row[N] * 3 ** N + code
+
+
+def _cells(code):
+    cells = []
+    for _ in range(N):
+        code, digit = divmod(code, 3)
+        cells.append(None if digit == 0 else digit - 1)
+    return cells
+
+
+def _permute_tables():
+    """Для каждой перестановки s - таблицы по байтам для f -> f∘s, где (f∘s)(r) = f(r'), бит v у r' = бит s[v] у r"""
+    tables = []
+    for s in PERMUTATIONS:
+        source = []
+        for r in range(ROWS):
+            values = row_values(r, N)
+            source.append(sum(values[s[v]] << (N - 1 - v) for v in range(N)))
+        low = [0] * 256
+        high = [0] * 256
+        for r in range(ROWS):
+            # бит source[r] исходной функции переходит в бит r новой
+            s_bit = source[r]
+            for byte in range(256):
+                if s_bit < 8 and byte >> s_bit & 1:
+                    low[byte] |= 1 << r
+                elif s_bit >= 8 and byte >> (s_bit - 8) & 1:
+                    high[byte] |= 1 << r
+        tables.append((low, high))
+    return tables
+
+
+def _row_masks():
+    """Для подстановки q и клеток фрагмента - маска строк таблицы, совпадающих с клетками"""
+    rows = [row_values(r, N) for r in range(ROWS)]
+    masks = []
+    for q in PERMUTATIONS:
+        by_cells = []
+        for code in range(3 ** N):
+            cells = _cells(code)
+            mask = 0
+            for r in range(ROWS):
+                if all(c is None or rows[r][q[j]] == c for j, c in enumerate(cells)):
+                    mask |= 1 << r
+            by_cells.append(mask)
+        masks.append(by_cells)
+    return masks
+
+
+_ROW_MASKS = None
+
+
+def _class_masks(representatives):
+    """Маски подстановок для каждого вида строки; работает в процессах пула"""
+    global _ROW_MASKS
+    if _ROW_MASKS is None:
+        _ROW_MASKS = _row_masks()
+    out = bytearray()
+    full = FUNCTIONS - 1
+    for f in representatives:
+        columns = (full ^ f, f)
+        for code in range(PATTERNS):
+            value, cells = divmod(code, 3 ** N)
+            rows = columns[value]
+            mask = 0
+            for q in range(len(PERMUTATIONS)):
+                if _ROW_MASKS[q][cells] & rows:
+                    mask |= 1 << q
+            out += mask.to_bytes(3, 'little')
+    return bytes(out)
+
+
+def build(path=DEFAULT_PATH, processes=None, chunk=64, log=sys.stderr):
+    tables = _permute_tables()
+
+    def permute(f, s):
+        low, high = tables[s]
+        return low[f & 255] | high[f >> 8]
+
+    # Представитель класса - наименьшая функция среди перестановок переменных
+    classes = {}
+    class_of = bytearray(2 * FUNCTIONS)
+    perm_of = bytearray(FUNCTIONS)
+    for f in range(FUNCTIONS):
+        representative = min(permute(f, s) for s in range(len(PERMUTATIONS)))
+        number = classes.setdefault(representative, len(classes))
+        struct.pack_into('<H', class_of, 2 * f, number)
+        # f = представитель∘s
+        perm_of[f] = next(s for s in range(len(PERMUTATIONS)) if permute(representative, s) == f)
+    representatives = sorted(classes, key=classes.get)
+    print(f"Классов функций: {len(representatives)}", file=log)
+
+    chunks = [representatives[i:i + chunk] for i in range(0, len(representatives), chunk)]
+    with Pool(processes) as pool:
+        masks = b''.join(pool.map(_class_masks, chunks))
+
+    payload = bytes(class_of) + bytes(perm_of) + masks
+    header = HEADER.pack(MAGIC, VERSION, len(representatives), PATTERNS, zlib.crc32(payload))
+    # запись во временный файл рядом и замена одним os.replace: прерванная сборка
+    # не оставит на месте индекса пустой или недописанный файл
+    fd, temp = tempfile.mkstemp(prefix='.answers', suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(payload)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+    print(f"Индекс записан: {path}, {len(header) + len(payload)} байт", file=log)
+
+
+class AnswerIndex:
+    def __init__(self, path=DEFAULT_PATH):
+        with open(path, 'rb') as f:
+            # пустой файл mmap не отображает (ValueError) - проверяем размер заранее
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise AnswerIndexError("Файл индекса слишком короткий")
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._check()
+        except AnswerIndexError:
+            self.data.close()
+            raise
+        self.perm_base = HEADER.size + 2 * FUNCTIONS
+        self.mask_base = self.perm_base + FUNCTIONS
+        # compose[s][q] - номер подстановки s∘q, где (s∘q)[j] = s[q[j]]
+        number = {p: i for i, p in enumerate(PERMUTATIONS)}
+        self.compose = [[number[tuple(s[j] for j in q)] for q in PERMUTATIONS] for s in PERMUTATIONS]
+
+    def _check(self):
+        magic, version, self.classes, patterns, checksum = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION or patterns != PATTERNS:
+            raise AnswerIndexError(f"Неподходящий файл индекса: {magic!r}, версия {version}")
+        if len(self.data) != HEADER.size + 3 * FUNCTIONS + 3 * PATTERNS * self.classes:
+            raise AnswerIndexError("Размер файла индекса не совпадает с заголовком")
+        if zlib.crc32(memoryview(self.data)[HEADER.size:]) != checksum:
+            raise AnswerIndexError("Контрольная сумма индекса не совпала")
+
+    def close(self):
+        self.data.close()
+
+    def permutations_for(self, packed, part_table):
+        """
+        Подстановки столбцов, при которых у каждой строки фрагмента есть совпадающая строка таблицы.
+        :param packed: столбец F функции четырёх переменных (16 бит)
+        :param part_table: строки фрагмента [c0, c1, c2, c3, F] с 0, 1 и None
+        :return: список кортежей подстановок в порядке возрастания
+        """
+        number, = struct.unpack_from('<H', self.data, HEADER.size + 2 * packed)
+        s = self.data[self.perm_base + packed]
+        base = self.mask_base + 3 * PATTERNS * number
+        mask = (1 << len(PERMUTATIONS)) - 1
+        for row in part_table:
+            offset = base + 3 * pattern_code(row)
+            mask &= int.from_bytes(self.data[offset:offset + 3], 'little')
+        # маска записана для представителя класса; для f = представитель∘s подстановка q становится s∘q
+        compose = self.compose[s]
+        result = [compose[q] for q in range(len(PERMUTATIONS)) if mask >> q & 1]
+        return [PERMUTATIONS[p] for p in sorted(result)]
+
+
+def load(path=DEFAULT_PATH):
+    """Индекс из файла или None, если файла нет"""
+    if not os.path.exists(path):
+        return None
+    return AnswerIndex(path)
+
+
+def check(path=DEFAULT_PATH, log=sys.stderr):
+    """Сверяет индекс с прямым подсчётом на всех функциях для каждой подстановки и каждого вида строки"""
+    index = AnswerIndex(path)
+    row_masks = _row_masks()
+    full = FUNCTIONS - 1
+    bad = 0
+    for f in range(0, FUNCTIONS, 97):
+        for code in range(PATTERNS):
+            value, cells = divmod(code, 3 ** N)
+            rows = f if value else full ^ f
+            expected = [PERMUTATIONS[q] for q in range(len(PERMUTATIONS)) if row_masks[q][cells] & rows]
+            if index.permutations_for(f, [_cells(cells) + [value]]) != expected:
+                bad += 1
+    index.close()
+    print("Индекс в порядке" if not bad else f"Расхождений: {bad}", file=log)
+    return not bad
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Индекс ответов для функций четырёх переменных")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_cmd = sub.add_parser('build', help="построить индекс")
+    build_cmd.add_argument('-o', '--output', default=DEFAULT_PATH)
+    build_cmd.add_argument('-j', '--processes', type=int, default=None, help="число процессов (по умолчанию - все ядра)")
+    check_cmd = sub.add_parser('check', help="проверить индекс")
+    check_cmd.add_argument('path', nargs='?', default=DEFAULT_PATH)
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        build(args.output, args.processes)
+    elif not check(args.path):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
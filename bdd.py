@@ -0,0 +1,255 @@
+"""
+Упорядоченные сокращённые диаграммы решений (ROBDD) для формул Solver.
+
+Нужны, когда переменных слишком много для таблицы: диаграмма строится по разобранной
+формуле (formula.py), а вопросы о фрагменте решаются сужением и подсчётом на диаграмме,
+строки таблицы не перечисляются.
+
+Узлы - целые числа: 0 - ложь, 1 - истина. Порядок переменных совпадает с порядком
+столбцов таблицы, поэтому выполняющие наборы, прочитанные как двоичные числа
+(первая переменная - старший бит), - это номера строк таблицы.
+"""
+from formula import postorder, row_values, variables_of
+from fragment_search import FragmentSearch
+
+FALSE = 0
+TRUE = 1
+
+
+class BDD:
+    # computed-таблица очищается, когда вырастает больше этого размера
+    COMPUTED_LIMIT = 1 << 20
+
+    def __init__(self, variables):
+        self.variables = tuple(variables)
+        n = len(self.variables)
+        # уровень терминалов - после всех переменных
+        self.var = [n, n]
+        self.low = [FALSE, TRUE]
+        self.high = [FALSE, TRUE]
+        self.unique = {}
+        self.computed = {}
+        self.counts = {FALSE: 0, TRUE: 1}
+
+    def __len__(self):
+        return len(self.var)
+
+    def mk(self, v, low, high):
+        """Узел с уникальной таблицей: одинаковые узлы не дублируются, лишние проверки убираются"""
+        if low == high:
+            return low
+        key = (v, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            node = len(self.var)
+            self.var.append(v)
+            self.low.append(low)
+            self.high.append(high)
+            self.unique[key] = node
+        return node
+
+    def literal(self, v, value=1):
+        return self.mk(v, FALSE, TRUE) if value else self.mk(v, TRUE, FALSE)
+
+    def cube(self, assignment):
+        """Конъюнкция литералов; assignment - {номер переменной: 0 или 1}"""
+        node = TRUE
+        for v in sorted(assignment, reverse=True):
+            node = self.mk(v, FALSE, node) if assignment[v] else self.mk(v, node, FALSE)
+        return node
+
+    def row_cube(self, r):
+        """Диаграмма ровно одной строки таблицы с номером r"""
+        return self.cube(dict(enumerate(row_values(r, len(self.variables)))))
+
+    def weight(self, low, high):
+        """Диаграмма строк таблицы, в номере которых от low до high единиц"""
+        n = len(self.variables)
+        # level[c] - диаграмма по переменным с текущей до последней, если выше уже c единиц
+        level = [TRUE if low <= c <= high else FALSE for c in range(n + 1)]
+        for v in range(n - 1, -1, -1):
+            level = [self.mk(v, level[c], level[c + 1]) for c in range(v + 1)]
+        return level[0]
+
+    def _cofactors(self, node, v):
+        if self.var[node] == v:
+            return self.low[node], self.high[node]
+        return node, node
+
+    def ite(self, f, g, h):
+        """if f then g else h - через неё выражаются все операции"""
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+        key = (f, g, h)
+        result = self.computed.get(key)
+        if result is None:
+            v = min(self.var[f], self.var[g], self.var[h])
+            f0, f1 = self._cofactors(f, v)
+            g0, g1 = self._cofactors(g, v)
+            h0, h1 = self._cofactors(h, v)
+            result = self.mk(v, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+            if len(self.computed) >= self.COMPUTED_LIMIT:
+                self.computed.clear()
+            self.computed[key] = result
+        return result
+
+    def neg(self, f):
+        return self.ite(f, FALSE, TRUE)
+
+    def conj(self, f, g):
+        return self.ite(f, g, FALSE)
+
+    def disj(self, f, g):
+        return self.ite(f, TRUE, g)
+
+    def from_tree(self, tree):
+        """Диаграмма по дереву формулы из formula.parse"""
+        missing = variables_of(tree) - set(self.variables)
+        if missing:
+            raise ValueError(f"Неизвестная переменная: {', '.join(sorted(missing))}")
+        position = {name: i for i, name in enumerate(self.variables)}
+        # postorder выдаёт каждый узел один раз; ключ - id, чтобы не хешировать поддерево целиком
+        built = {}
+        for node in postorder(tree):
+            op = node[0]
+            if op == 'var':
+                result = self.literal(position[node[1]])
+            elif op == 'const':
+                result = TRUE if node[1] else FALSE
+            elif op == 'not':
+                result = self.neg(built[id(node[1])])
+            else:
+                a, b = built[id(node[1])], built[id(node[2])]
+                if op == 'and':
+                    result = self.conj(a, b)
+                elif op == 'or':
+                    result = self.disj(a, b)
+                elif op == 'xor':
+                    result = self.ite(a, self.neg(b), b)
+                elif op == 'eq':
+                    result = self.ite(a, b, self.neg(b))
+                else:
+                    result = self.ite(a, b, TRUE)
+            built[id(node)] = result
+        return built[id(tree)]
+
+    def _count(self, node):
+        """Число выполняющих наборов переменных с уровня узла и ниже"""
+        result = self.counts.get(node)
+        if result is None:
+            v = self.var[node]
+            low, high = self.low[node], self.high[node]
+            result = (self._count(low) << (self.var[low] - v - 1)) + (self._count(high) << (self.var[high] - v - 1))
+            self.counts[node] = result
+        return result
+
+    def count(self, f):
+        """Число строк таблицы, где f истинна"""
+        return self._count(f) << self.var[f]
+
+    def iter_rows(self, f):
+        """Номера строк, где f истинна, по возрастанию; выдаются лениво"""
+        n = len(self.variables)
+
+        def walk(node, level, prefix):
+            if node == FALSE:
+                return
+            if level == n:
+                yield prefix
+                return
+            if self.var[node] > level:
+                # переменная пропущена в диаграмме - годятся оба значения
+                yield from walk(node, level + 1, prefix << 1)
+                yield from walk(node, level + 1, prefix << 1 | 1)
+            else:
+                yield from walk(self.low[node], level + 1, prefix << 1)
+                yield from walk(self.high[node], level + 1, prefix << 1 | 1)
+
+        return walk(f, 0, 0)
+
+
+
+class FragmentMatcher(FragmentSearch):
+    """
+    Подбор строк и подстановки столбцов для фрагмента по диаграмме функции.
+    Тот же поиск, что у табличного Solver (fragment_search.FragmentSearch), но множества строк - диаграммы,
+    а не битовые маски.
+    """
+
+    def __init__(self, bdd, root, part_table, tick=None):
+        """
+        :param tick: вызывается на каждом узле поиска (счётчик, проверка отмены)
+        """
+        self.bdd = bdd
+        self.tick = tick
+        self.root = root
+        self.part_table = part_table
+        self.variables = bdd.variables
+        self.n = len(bdd.variables)
+        self.f_rows = (bdd.neg(root), root)
+        self.literals = [(bdd.literal(v, 0), bdd.literal(v, 1)) for v in range(self.n)]
+        self.weights = {}
+
+    def _tick(self):
+        if self.tick is not None:
+            self.tick()
+
+    def column_signatures(self):
+        # сигнатура столбца считается подсчётом на диаграмме, а не по строкам
+        bdd = self.bdd
+        return [[bdd.count(bdd.conj(self.f_rows[f], self.literals[v][b])) for f in (0, 1) for b in (0, 1)]
+                for v in range(self.n)]
+
+    def _weight_rows(self, low, high):
+        node = self.weights.get((low, high))
+        if node is None:
+            node = self.weights[low, high] = self.bdd.weight(low, high)
+        return node
+
+    def _candidate_rows(self, f, fixed, reach, chosen, weight):
+        bdd = self.bdd
+        node = bdd.conj(bdd.conj(self.f_rows[f], weight), bdd.cube(fixed))
+        for domain, value in reach:
+            union = FALSE
+            for v in domain:
+                union = bdd.disj(union, self.literals[v][value])
+            node = bdd.conj(node, union)
+        for r in chosen:
+            node = bdd.conj(node, bdd.neg(bdd.row_cube(r)))
+        return node
+
+    def _has_value(self, node, v, value):
+        return self.bdd.conj(node, self.literals[v][value]) != FALSE
+
+    def _iter_rows(self, node):
+        return self.bdd.iter_rows(node)
+
+    def _distinct_rows(self, candidates, used):
+        """Есть ли различные строки для всех candidates, не совпадающие с used"""
+        if not candidates:
+            return True
+        bdd = self.bdd
+        rest = candidates[0]
+        for r in used:
+            rest = bdd.conj(rest, bdd.neg(bdd.row_cube(r)))
+        for r in bdd.iter_rows(rest):
+            if self._distinct_rows(candidates[1:], list(used) + [r]):
+                return True
+        return False
+
+    def solve(self):
+        """Первый ответ (index, filled_rows) в порядке полного перебора или -1"""
+        for rows, known in self._row_tuples():
+            index = next(self._indexes(self._compatible(rows, known), []))
+            filled = []
+            for r, row in zip(rows, self.part_table):
+                values = row_values(r, self.n)
+                filled.append([values[v] for v in index] + [row[-1]])
+            return tuple(index), filled
+        return -1
@@ -0,0 +1,101 @@
+"""
+Пакетное решение задач №2 без интерфейса.
+
+Вход - JSONL, по задаче в строке:
+{"id": 1, "func": "(x or y) and not (y == z) and not w", "table": [[0, 1, null, null, 0], ...]}
+необязательные поля "variables": null, "auto" или список имён и "backend" (как в Solver).
+Выход - JSONL в том же порядке:
+{"id": 1, "answer": "zyxw", "order": ["z", "y", "x", "w"], "rows": [[...], ...]}
+{"id": 2, "answer": null} - решения нет, {"id": 3, "error": "..."} - задачу не удалось разобрать.
+
+Пример: python bulk_solver.py tasks.jsonl -o answers.jsonl -j 8
+"""
+import argparse
+import json
+import sys
+import time
+from multiprocessing import Pool
+
+from solver import Solver
+
+
+def solve_task(task):
+    """Решает одну задачу-словарь и возвращает словарь с ответом (без id)"""
+    result = {}
+    try:
+        solver = Solver(task['func'], task['table'], task.get('variables'), task.get('backend', 'auto'))
+        solution = solver.solve()
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        return result
+    if solution == -1:
+        result['answer'] = None
+    else:
+        index, rows = solution
+        order = [solver.variables[i] for i in index]
+        result['answer'] = ''.join(order)
+        result['order'] = order
+        result['rows'] = rows
+    return result
+
+
+def solve_line(line):
+    """Решает одну задачу из строки JSONL и возвращает строку JSONL с ответом"""
+    try:
+        task = json.loads(line)
+        result = {'id': task.get('id')}
+    except Exception as e:
+        return json.dumps({'error': f"{type(e).__name__}: {e}"}, ensure_ascii=False)
+    result.update(solve_task(task))
+    return json.dumps(result, ensure_ascii=False)
+
+
+def read_tasks(stream):
+    for line in stream:
+        if line.strip():
+            yield line
+
+
+def run(source, target, processes=None, chunk_size=64, report_every=0, log=sys.stderr):
+    """
+    Решает все задачи из source и пишет ответы в target в порядке входа.
+    :return: (число задач, время в секундах)
+    """
+    count = 0
+    start = time.perf_counter()
+    with Pool(processes) as pool:
+        # imap сохраняет порядок и отдаёт ответы по мере готовности, задачи уходят процессам пачками
+        for answer in pool.imap(solve_line, read_tasks(source), chunksize=chunk_size):
+            target.write(answer + '\n')
+            count += 1
+            if report_every and count % report_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{count} задач, {count / elapsed:.1f} задач/с", file=log, flush=True)
+    target.flush()
+    return count, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетное решение задач №2 из JSONL")
+    parser.add_argument('input', nargs='?', default='-', help="файл с задачами, '-' - stdin")
+    parser.add_argument('-o', '--output', default='-', help="файл для ответов, '-' - stdout")
+    parser.add_argument('-j', '--processes', type=int, default=None, help="число процессов (по умолчанию - все ядра)")
+    parser.add_argument('--chunk-size', type=int, default=64, help="задач в одной пачке для процесса")
+    parser.add_argument('--report-every', type=int, default=0, help="печатать скорость каждые N задач")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        count, elapsed = run(source, target, args.processes, args.chunk_size, args.report_every)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    rate = count / elapsed if elapsed else 0.0
+    print(f"Решено задач: {count} за {elapsed:.2f} с ({rate:.1f} задач/с)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
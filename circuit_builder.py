@@ -0,0 +1,185 @@
+"""
+Сборка схемы по формуле (та же запись, что у Solver: formula.parse) со структурным хешированием.
+
+Каждый элемент ищется в таблице по ключу (операция, входы) до создания: одинаковые подформулы -
+один и тот же элемент, в том числе в разных формулах одного сборщика. При сборке сразу
+сворачиваются константы (x ∧ 0 = 0, x ∨ 0 = x), убирается двойное отрицание (¬¬x = x)
+и очевидные случаи x ∧ x = x, x ∧ ¬x = 0, x ∨ ¬x = 1, x xor x = 0. Входы and/or/xor упорядочены,
+так что x ∧ y и y ∧ x совпадают. xor - отдельный элемент, ≡ - его отрицание, a → b - ¬a ∨ b.
+
+Схема хранится в gatestore.GateStore (провода - номера), для пачек из тысяч формул это дешевле объектов.
+Из неё можно получить обычные элементы logelement:
+    builder = CircuitBuilder(('x', 'y', 'z'))
+    f = builder.add("(x ∧ y) ∨ ¬¬(y ∧ x) ∨ z")
+    builder.store.truth_table([f])                 -> [0b11101010]
+    inputs, (out,) = builder.elements([f])         # TInput по именам и выходной элемент
+"""
+from formula import parse, postorder, variables_of
+from gatestore import GateStore, NOT, AND, OR, BUF, XOR, MUX, INPUT, CONST
+import logelement
+
+
+class CircuitBuilder:
+    def __init__(self, variables=None, store=None):
+        """
+        :param variables: имена входов заранее (порядок входов схемы); остальные добавляются по мере появления
+        :param store: GateStore, в который добавлять элементы; по умолчанию новый
+        """
+        self.store = GateStore() if store is None else store
+        self.inputs = {}
+        # структурное хеширование: (операция, вход 1, вход 2[, выбор mux]) -> провод
+        self.table = {}
+        self.consts = {}
+        for name in variables or ():
+            self.input(name)
+
+    def input(self, name):
+        net = self.inputs.get(name)
+        if net is None:
+            net = self.inputs[name] = self.store.add_input()
+        return net
+
+    def const(self, value):
+        value = 1 if value else 0
+        net = self.consts.get(value)
+        if net is None:
+            net = self.consts[value] = self.store.add_const(value)
+        return net
+
+    def constant(self, net):
+        """Значение провода-константы или None"""
+        return self.store.values[net] if self.store.ops[net] == CONST else None
+
+    def inverse(self, net):
+        """Провод x, если net = ¬x, иначе None"""
+        return self.store.src1[net] if self.store.ops[net] == NOT else None
+
+    def gate(self, op, a, b=None, select=None):
+        """Элемент op с входами a, b (и выбором select у mux) без упрощений, но через таблицу хеширования"""
+        key = (op, a, b) if select is None else (op, a, b, select)
+        net = self.table.get(key)
+        if net is None:
+            net = self.table[key] = self.store.add_gate(op, a, b, select)
+        return net
+
+    def not_(self, a):
+        value = self.constant(a)
+        if value is not None:
+            return self.const(not value)
+        inner = self.inverse(a)
+        if inner is not None:
+            return inner
+        return self.gate('not', a)
+
+    def _complementary(self, a, b):
+        return self.inverse(a) == b or self.inverse(b) == a
+
+    def and_(self, a, b):
+        for x, y in ((a, b), (b, a)):
+            value = self.constant(x)
+            if value is not None:
+                return y if value else x
+        if a == b:
+            return a
+        if self._complementary(a, b):
+            return self.const(0)
+        return self.gate('and', min(a, b), max(a, b))
+
+    def or_(self, a, b):
+        for x, y in ((a, b), (b, a)):
+            value = self.constant(x)
+            if value is not None:
+                return x if value else y
+        if a == b:
+            return a
+        if self._complementary(a, b):
+            return self.const(1)
+        return self.gate('or', min(a, b), max(a, b))
+
+    def xor(self, a, b):
+        for x, y in ((a, b), (b, a)):
+            value = self.constant(x)
+            if value is not None:
+                return self.not_(y) if value else y
+        if a == b:
+            return self.const(0)
+        if self._complementary(a, b):
+            return self.const(1)
+        return self.gate('xor', min(a, b), max(a, b))
+
+    def add(self, formula):
+        """Добавляет формулу (строку или дерево formula.parse); провод её значения"""
+        tree = parse(formula) if isinstance(formula, str) else formula
+        for name in sorted(variables_of(tree) - set(self.inputs)):
+            self.input(name)
+        nets = {}
+        for node in postorder(tree):
+            op = node[0]
+            if op == 'var':
+                nets[id(node)] = self.inputs[node[1]]
+            elif op == 'const':
+                nets[id(node)] = self.const(node[1])
+            else:
+                nets[id(node)] = self._apply(op, [nets[id(child)] for child in node[1:]])
+        return nets[id(tree)]
+
+    def _apply(self, op, args):
+        if op == 'not':
+            return self.not_(args[0])
+        a, b = args
+        if op == 'and':
+            return self.and_(a, b)
+        if op == 'or':
+            return self.or_(a, b)
+        if op == 'xor':
+            return self.xor(a, b)
+        if op == 'eq':
+            return self.not_(self.xor(a, b))
+        if op == 'imp':
+            return self.or_(self.not_(a), b)
+        raise ValueError(f"Неизвестная операция: {op!r}")
+
+    def elements(self, outputs):
+        """
+        Элементы logelement для проводов outputs и всего, от чего они зависят.
+        :return: (словарь имя входа -> TInput, список выходных элементов)
+        """
+        inputs, elements = to_elements(self.store, outputs)
+        names = {net: name for name, net in self.inputs.items()}
+        return {names[net]: el for net, el in zip(self.store.inputs, inputs)}, elements
+
+
+def build(formula, variables=None):
+    """Схема одной формулы: (GateStore, провод выхода)"""
+    builder = CircuitBuilder(variables)
+    return builder.store, builder.add(formula)
+
+
+_ELEMENTS = {AND: logelement.TAnd, OR: logelement.TOr, XOR: logelement.TXor, MUX: logelement.TMux}
+
+
+def to_elements(store, outputs):
+    """
+    Элементы logelement по схеме GateStore: для проводов outputs и всего, от чего они зависят.
+    :return: (TInput для всех входов схемы в порядке store.inputs, список выходных элементов);
+             выход-константа - TInput с постоянным значением
+    """
+    # нужны только элементы, от которых зависят выходы, и все входы схемы
+    needed = store.live(outputs) | set(store.inputs)
+    made = {}
+    for net in sorted(needed):
+        code = store.ops[net]
+        if code in (INPUT, CONST):
+            el = logelement.TInput()
+            el.In1 = bool(store.values[net])
+        elif code in (NOT, BUF):
+            el = logelement.TNot() if code == NOT else logelement.TInput()
+            made[store.src1[net]].link(el, 1)
+        else:
+            el = _ELEMENTS[code]()
+            made[store.src1[net]].link(el, 1)
+            made[store.src2[net]].link(el, 2)
+            if code == MUX:
+                made[store.select[net]].link(el, 3)
+        made[net] = el
+    return [made[net] for net in store.inputs], [made[net] for net in outputs]
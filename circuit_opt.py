@@ -0,0 +1,174 @@
+"""
+Оптимизация схем logelement: проходы над компактной схемой gatestore.GateStore.
+
+Каждый проход строит новую схему через circuit_builder.CircuitBuilder (входы схемы и их порядок не меняются),
+так что свёртка констант (x ∧ 0 = 0, x xor 1 = ¬x), ¬¬x = x, x ∧ x = x, x ∧ ¬x = 0, x xor x = 0,
+общие подвыражения и удаление повторителей делаются при любой пересборке. Свои правила проходов:
+    constants  - mux с постоянным выбором или постоянными входами, mux с одинаковыми входами;
+    rewrite    - поглощение x ∧ (x ∨ y) = x, x ∨ (x ∧ y) = x
+                 и закон де Моргана ¬x ∧ ¬y = ¬(x ∨ y), если отрицания больше никуда не идут;
+    dead       - удаление элементов, от которых не зависит ни один выход.
+После каждого прохода схема сверяется с исходной на случайных наборах (equivalence.random_check):
+если функция изменилась - OptimizationError.
+
+    store, outputs, report = optimize(store, outputs)
+    print(format_report(report))
+    inputs, outputs = optimize_elements([elA, elB, ...])     # то же для элементов logelement
+"""
+import netlist
+from circuit_builder import CircuitBuilder, to_elements
+from equivalence import random_check
+from gatestore import GateStore, NOT, AND, OR, BUF, XOR, MUX, INPUT, CONST
+
+# число случайных наборов входов для сверки после прохода
+VECTORS = 1024
+ROUNDS = 4
+
+
+class OptimizationError(RuntimeError):
+    """Проход оптимизации изменил функцию схемы"""
+
+
+def _mux(builder, a, b, select):
+    value = builder.constant(select)
+    if value is not None:
+        return b if value else a
+    if a == b:
+        return a
+    # mux(0, 1, s) = s, mux(1, 0, s) = ¬s
+    low, high = builder.constant(a), builder.constant(b)
+    if low is not None and high is not None:
+        return select if high else builder.not_(select)
+    return builder.gate('mux', a, b, select)
+
+
+def _build(builder, i, code, a, b, select):
+    """Элемент code через сборщик: упрощения CircuitBuilder и правила mux"""
+    if code == BUF:
+        return a
+    if code == NOT:
+        return builder.not_(a)
+    if code == AND:
+        return builder.and_(a, b)
+    if code == OR:
+        return builder.or_(a, b)
+    if code == XOR:
+        return builder.xor(a, b)
+    return _mux(builder, a, b, select)
+
+
+def _rebuild(store, outputs, rule=_build, keep=None):
+    """rule(builder, i, code, a, b, select) - провод новой схемы для элемента i; select - выбор mux или None"""
+    builder = CircuitBuilder(store=GateStore())
+    net = [None] * len(store)
+    for i, (code, a, b) in enumerate(zip(store.ops, store.src1, store.src2)):
+        if code == INPUT:
+            net[i] = builder.input(i)
+        elif keep is not None and i not in keep:
+            continue
+        elif code == CONST:
+            net[i] = builder.const(store.values[i])
+        else:
+            select = net[store.select[i]] if code == MUX else None
+            net[i] = rule(builder, i, code, net[a], net[b], select)
+    return builder.store, [net[out] for out in outputs]
+
+
+def _fanout(store, outputs):
+    """Сколько раз провод идёт на входы элементов и выходы схемы"""
+    count = [0] * len(store)
+    for code, a, b in zip(store.ops, store.src1, store.src2):
+        if code in (NOT, BUF):
+            count[a] += 1
+        elif code not in (INPUT, CONST):
+            count[a] += 1
+            count[b] += 1
+    for net in store.select.values():
+        count[net] += 1
+    for out in outputs:
+        count[out] += 1
+    return count
+
+
+def _rewriter(store, outputs):
+    fanout = _fanout(store, outputs)
+
+    def rule(builder, i, code, a, b, select):
+        if code not in (AND, OR):
+            return _build(builder, i, code, a, b, select)
+        # поглощение: x ∧ (x ∨ y) = x, x ∨ (x ∧ y) = x
+        other = OR if code == AND else AND
+        new = builder.store
+        for x, y in ((a, b), (b, a)):
+            if new.ops[y] == other and x in (new.src1[y], new.src2[y]):
+                return x
+        # де Морган: ¬x ∧ ¬y = ¬(x ∨ y), ¬x ∨ ¬y = ¬(x ∧ y) - на один элемент меньше,
+        # если старые отрицания больше никуда не подаются
+        x, y = builder.inverse(a), builder.inverse(b)
+        old_a, old_b = store.src1[i], store.src2[i]
+        if x is not None and y is not None and fanout[old_a] == 1 and fanout[old_b] == 1:
+            return builder.not_(_build(builder, i, other, x, y, None))
+        return _build(builder, i, code, a, b, select)
+
+    return rule
+
+
+def constants(store, outputs):
+    return _rebuild(store, outputs)
+
+
+def rewrite(store, outputs):
+    return _rebuild(store, outputs, _rewriter(store, outputs))
+
+
+def dead(store, outputs):
+    return _rebuild(store, outputs, keep=store.live(outputs))
+
+
+PASSES = (('constants', constants), ('rewrite', rewrite), ('dead', dead))
+
+
+def optimize(store, outputs, passes=PASSES, vectors=VECTORS, rounds=ROUNDS):
+    """
+    Прогоняет проходы по кругу, пока схема уменьшается (не больше rounds кругов).
+    :return: (новая схема, провода выходов в ней, отчёт - список (проход, элементов до, после, глубина до, после))
+    """
+    report = []
+    original, original_outputs = store, list(outputs)
+    outputs = list(outputs)
+    for _ in range(rounds):
+        size = (store.gate_count(), store.depth(outputs))
+        for name, run in passes:
+            before = (store.gate_count(), store.depth(outputs))
+            store, outputs = run(store, outputs)
+            after = (store.gate_count(), store.depth(outputs))
+            found = random_check((original, original_outputs, store, outputs), vectors)
+            if found is not None:
+                raise OptimizationError(f"Проход {name} изменил выход {found[1]}")
+            report.append((name, before[0], after[0], before[1], after[1]))
+        if (store.gate_count(), store.depth(outputs)) == size:
+            break
+    return store, outputs, report
+
+
+def format_report(report):
+    lines = [f"{'проход':<10} {'элементов':>16} {'глубина':>12}"]
+    for name, gates_before, gates_after, depth_before, depth_after in report:
+        lines.append(f"{name:<10} {gates_before:>7} -> {gates_after:<6} {depth_before:>5} -> {depth_after:<4}")
+    if report:
+        lines.append(f"{'итого':<10} {report[0][1]:>7} -> {report[-1][2]:<6} {report[0][3]:>5} -> {report[-1][4]:<4}")
+    return "\n".join(lines)
+
+
+def optimize_elements(elements, outputs=None, **options):
+    """
+    Оптимизирует схему из элементов logelement (как у netlist.Circuit) и собирает её заново.
+    :param outputs: выходные элементы; по умолчанию - элементы, выход которых никуда не идёт
+    :return: (новые TInput в порядке входов Circuit.inputs, новые выходные элементы, отчёт)
+    """
+    circuit = netlist.Circuit(elements)
+    store = GateStore.from_circuit(circuit)
+    outputs = circuit.outputs if outputs is None else outputs
+    store, nets, report = optimize(store, GateStore.circuit_nets(circuit, outputs), **options)
+    inputs, elements = to_elements(store, nets)
+    return inputs, elements, report
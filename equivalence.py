@@ -0,0 +1,130 @@
+"""
+Проверка эквивалентности схем перебором всех наборов входов.
+
+Схемы задаются как угодно из:
+    (GateStore, провода выходов)          - компактная схема;
+    netlist.Circuit                       - выходы circuit.outputs;
+    список элементов logelement           - собирается в netlist.Circuit;
+    строка формулы                        - собирается circuit_builder, входы - variables
+                                            (по умолчанию порядок Solver: x, y, z, w, остальные по алфавиту).
+Входы сопоставляются по порядку, число входов и выходов должно совпадать.
+
+Сначала схемы сверяются на случайных наборах - неэквивалентные почти всегда отсеиваются сразу.
+Затем все 2 ** n наборов делятся на куски по TASK_ROWS строк, куски бит-параллельно (блоками chunk_rows)
+проверяются в процессах ProcessPoolExecutor. Первый найденный контрпример останавливает остальные процессы.
+
+    check_equivalence(student, "(x ∧ ¬y) ∨ (¬x ∧ y)")    -> None или ([1, 1], 0): наборы входов и номер выхода
+"""
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import netlist
+from circuit_builder import CircuitBuilder
+from formula import CHUNK_ROWS, iter_blocks, row_values
+from gatestore import GateStore
+from solver import find_variables
+
+VECTORS = 4096
+# строк на одну задачу процесса; меньше - перебор в текущем процессе
+TASK_ROWS = 1 << 20
+
+_pair = None
+_stop = None
+
+
+def as_store(circuit, variables=None):
+    """Схема в виде (GateStore, провода выходов)"""
+    if isinstance(circuit, str):
+        if variables is None:
+            variables = find_variables(circuit)
+        builder = CircuitBuilder(variables)
+        return builder.store, [builder.add(circuit)]
+    if isinstance(circuit, tuple):
+        store, outputs = circuit
+        return store, list(outputs)
+    if not isinstance(circuit, netlist.Circuit):
+        circuit = netlist.Circuit(circuit)
+    return GateStore.from_circuit(circuit), GateStore.circuit_nets(circuit, circuit.outputs)
+
+
+def _difference(pair, words, mask):
+    """Первый бит, на котором выходы схем различаются: (номер бита, номер выхода) или None"""
+    store, outputs, other, other_outputs = pair
+    state = store.simulate(words, mask)
+    other_state = other.simulate(words, mask)
+    for k, (a, b) in enumerate(zip(outputs, other_outputs)):
+        diff = state[a] ^ other_state[b]
+        if diff:
+            return (diff & -diff).bit_length() - 1, k
+    return None
+
+
+def random_check(pair, vectors=VECTORS, seed=0):
+    """Сверка на vectors случайных наборах: контрпример (значения входов, номер выхода) или None"""
+    rng = random.Random(seed)
+    n = len(pair[0].inputs)
+    words = [rng.getrandbits(vectors) for _ in range(n)]
+    found = _difference(pair, words, (1 << vectors) - 1)
+    if found is None:
+        return None
+    bit, k = found
+    return [(word >> bit) & 1 for word in words], k
+
+
+def _init(pair, stop):
+    global _pair, _stop
+    _pair = pair
+    _stop = stop
+
+
+def _check_rows(start, stop, chunk_rows, pair=None, event=None):
+    """Перебор строк [start, stop): (номер строки, номер выхода) первого различия или None"""
+    pair = pair or _pair
+    event = event or _stop
+    n = len(pair[0].inputs)
+    for first, words, mask in iter_blocks(n, chunk_rows, start, stop):
+        if event is not None and event.is_set():
+            return None
+        found = _difference(pair, words, mask)
+        if found is not None:
+            bit, k = found
+            return first + bit, k
+    return None
+
+
+def check_equivalence(circuit, other, variables=None, processes=None, chunk_rows=CHUNK_ROWS,
+                      vectors=VECTORS):
+    """
+    Эквивалентны ли схемы на всех наборах входов.
+    :return: None, если эквивалентны, иначе контрпример (значения входов, номер выхода)
+    """
+    pair = as_store(circuit, variables) + as_store(other, variables)
+    n = len(pair[0].inputs)
+    if n != len(pair[2].inputs) or len(pair[1]) != len(pair[3]):
+        raise ValueError(f"У схем разное число входов ({n} и {len(pair[2].inputs)}) "
+                         f"или выходов ({len(pair[1])} и {len(pair[3])})")
+    found = random_check(pair, vectors)
+    if found is not None:
+        return found
+    rows = 1 << n
+    task_rows = max(TASK_ROWS, chunk_rows)
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or rows <= task_rows:
+        found = _check_rows(0, rows, chunk_rows, pair)
+        return None if found is None else (row_values(found[0], n), found[1])
+    # событие остановки: процессы проверяют его между блоками и бросают работу после первого контрпримера
+    context = multiprocessing.get_context()
+    stop = context.Event()
+    pool = ProcessPoolExecutor(processes, mp_context=context, initializer=_init, initargs=(pair, stop))
+    try:
+        futures = [pool.submit(_check_rows, start, start + task_rows, chunk_rows) for start in range(0, rows, task_rows)]
+        for future in as_completed(futures):
+            found = future.result()
+            if found is not None:
+                stop.set()
+                return row_values(found[0], n), found[1]
+        return None
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
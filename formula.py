@@ -0,0 +1,439 @@
+"""
+Разбор логических формул без eval.
+
+Понимает обе записи операций:
+    ¬ not        отрицание
+    ∧ and        конъюнкция
+    ∨ or         дизъюнкция
+    → ⇒          импликация
+    ≡ ↔ ⇔        эквивалентность
+    == != <= < >= >   сравнения как в Python (связывают сильнее not, цепочки a == b == c)
+константы 0, 1, True, False и скобки.
+
+Приоритет по школьным правилам: ¬, ∧, ∨, →, ≡; операции одного приоритета выполняются слева направо.
+Python-запись сохраняет приоритеты Python: "not w == x" - это not (w == x).
+
+Дерево формулы - кортежи: ('var', имя), ('const', 0 или 1), ('not', a),
+('and', a, b), ('or', a, b), ('xor', a, b), ('eq', a, b), ('imp', a, b).
+
+Глубина разбора и обхода не ограничена стеком Python: цепочки ∧, ∨, ≡ собираются в сбалансированное
+дерево (ДНФ из тысяч слагаемых - глубина порядка log n), скобки разбираются изнутри наружу, а подряд
+идущие ¬ - циклом. Одинаковые поддеревья - один и тот же кортеж (_Nodes), поэтому упрощения вроде x ∧ x = x
+сравнивают их через is. Построители (compile_formula, bdd, sat, circuit_builder) обходят дерево
+через postorder, без рекурсии.
+
+Значения переменных на строках таблицы для compile_formula и бит-параллельных схем (netlist, gatestore):
+variable_masks - маски всей таблицы, iter_blocks - те же значения блоками по chunk_rows строк,
+weight_masks - строки таблицы по числу единиц в номере.
+"""
+import re
+from functools import lru_cache
+
+CHUNK_ROWS = 1 << 16
+
+
+class FormulaError(ValueError):
+    pass
+
+
+_TOKEN = re.compile(r"\s*(?:(?P<name>[A-Za-z_][A-Za-z_0-9]*)|(?P<const>[01])|"
+                    r"(?P<op>==|!=|<=|>=|<|>|\(|\)|¬|∧|∨|→|⇒|≡|↔|⇔))")
+
+_WORDS = {'not': '¬', 'and': '∧', 'or': '∨', 'True': '1', 'False': '0'}
+_SYMBOLS = {'⇒': '→', '↔': '≡', '⇔': '≡'}
+_COMPARE = ('==', '!=', '<=', '>=', '<', '>')
+
+
+def tokenize(text):
+    """Список пар (вид, значение); вид - 'var', 'const' или 'op', в конце ('end', None)"""
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            rest = text[pos:].lstrip()
+            raise FormulaError(f"Непонятный символ {rest[:1]!r} в позиции {len(text) - len(rest)}")
+        pos = match.end()
+        if match.group('name'):
+            word = _WORDS.get(match.group('name'))
+            if word is None:
+                tokens.append(('var', match.group('name')))
+            elif word in '01':
+                tokens.append(('const', int(word)))
+            else:
+                tokens.append(('op', word))
+        elif match.group('const'):
+            tokens.append(('const', int(match.group('const'))))
+        else:
+            op = match.group('op')
+            tokens.append(('op', _SYMBOLS.get(op, op)))
+    tokens.append(('end', None))
+    return tokens
+
+
+class _Nodes:
+    """
+    Построение узлов сразу со свёрткой констант и простыми упрощениями.
+    Узлы хешируются по операции и входам: одинаковые поддеревья - один и тот же кортеж,
+    так что совпадение поддеревьев проверяется через is, без сравнения вложенных кортежей.
+    """
+
+    def __init__(self):
+        self.table = {}
+
+    def node(self, op, *args):
+        # у листьев ключ - сам кортеж, у операций - номера уже единственных входов
+        key = (op,) + (args if op in ('var', 'const') else tuple(id(a) for a in args))
+        node = self.table.get(key)
+        if node is None:
+            node = self.table[key] = (op,) + args
+        return node
+
+    def not_(self, a):
+        if a[0] == 'const':
+            return self.node('const', 1 - a[1])
+        if a[0] == 'not':
+            return a[1]
+        return self.node('not', a)
+
+    def and_(self, a, b):
+        if a[0] == 'const':
+            return b if a[1] else a
+        if b[0] == 'const':
+            return a if b[1] else b
+        return a if a is b else self.node('and', a, b)
+
+    def or_(self, a, b):
+        if a[0] == 'const':
+            return a if a[1] else b
+        if b[0] == 'const':
+            return b if b[1] else a
+        return a if a is b else self.node('or', a, b)
+
+    def xor(self, a, b):
+        if a[0] == 'const':
+            return self.not_(b) if a[1] else b
+        if b[0] == 'const':
+            return self.not_(a) if b[1] else a
+        return self.node('const', 0) if a is b else self.node('xor', a, b)
+
+    def eq(self, a, b):
+        if a[0] == 'const':
+            return b if a[1] else self.not_(b)
+        if b[0] == 'const':
+            return a if b[1] else self.not_(a)
+        return self.node('const', 1) if a is b else self.node('eq', a, b)
+
+    def imp(self, a, b):
+        if a[0] == 'const':
+            return b if a[1] else self.node('const', 1)
+        if b[0] == 'const':
+            return b if b[1] else self.not_(a)
+        return self.node('const', 1) if a is b else self.node('imp', a, b)
+
+    def compare(self, op, a, b):
+        if op == '==':
+            return self.eq(a, b)
+        if op == '!=':
+            return self.xor(a, b)
+        if op == '<=':
+            return self.imp(a, b)
+        if op == '>=':
+            return self.imp(b, a)
+        if op == '<':
+            return self.and_(self.not_(a), b)
+        return self.and_(a, self.not_(b))
+
+
+def _balanced(make, items):
+    """Операнды цепочки ассоциативной операции попарно: глубина дерева - log2 от их числа"""
+    while len(items) > 1:
+        items = [make(items[i], items[i + 1]) if i + 1 < len(items) else items[i] for i in range(0, len(items), 2)]
+    return items[0]
+
+
+class _Parser:
+    """
+    Разбор последовательности лексем без скобок: каждая скобка уже разобрана
+    и стоит в последовательности одной лексемой ('tree', поддерево). Так глубина рекурсии
+    не зависит от вложенности скобок. closing - лексема, которой должна кончаться последовательность,
+    positions - номера лексем в исходной формуле (для выбора самой левой ошибки),
+    nodes - общая для всех групп формулы таблица узлов _Nodes.
+    """
+
+    def __init__(self, tokens, positions, nodes, closing=('end', None)):
+        self.tokens = tokens
+        self.nodes = nodes
+        self.positions = positions
+        self.closing = closing
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def take(self, *ops):
+        kind, value = self.tokens[self.pos]
+        if kind == 'op' and value in ops:
+            self.pos += 1
+            return value
+        return None
+
+    def error(self, message):
+        kind, value = self.peek()
+        if kind == 'end':
+            found = "конец формулы"
+        else:
+            found = repr('(' if kind == 'tree' else str(value))
+        error = FormulaError(f"{message}, а встретилось {found}")
+        error.position = self.positions[self.pos]
+        return error
+
+    def parse(self):
+        tree = self.equiv()
+        if self.peek() != self.closing:
+            raise self.error("Ожидался конец формулы" if self.closing[0] == 'end' else "Ожидалась ')'")
+        return tree
+
+    def equiv(self):
+        items = [self.imp()]
+        while self.take('≡'):
+            items.append(self.imp())
+        return _balanced(self.nodes.eq, items)
+
+    def imp(self):
+        tree = self.disj()
+        while self.take('→'):
+            tree = self.nodes.imp(tree, self.disj())
+        return tree
+
+    def disj(self):
+        items = [self.conj()]
+        while self.take('∨'):
+            items.append(self.conj())
+        return _balanced(self.nodes.or_, items)
+
+    def conj(self):
+        items = [self.neg()]
+        while self.take('∧'):
+            items.append(self.neg())
+        return _balanced(self.nodes.and_, items)
+
+    def neg(self):
+        return self._negated(self.compare)
+
+    def compare(self):
+        left = self.atom()
+        parts = []
+        while True:
+            op = self.take(*_COMPARE)
+            if op is None:
+                break
+            right = self.atom()
+            parts.append(self.nodes.compare(op, left, right))
+            left = right
+        return _balanced(self.nodes.and_, parts) if parts else left
+
+    def atom(self):
+        return self._negated(self._operand)
+
+    def _operand(self):
+        kind, value = self.peek()
+        if kind in ('var', 'const'):
+            self.pos += 1
+            return self.nodes.node(kind, value)
+        if kind == 'tree':
+            self.pos += 1
+            return value
+        raise self.error("Ожидалась переменная, константа или '('")
+
+    def _negated(self, operand):
+        """operand() под идущими подряд ¬: отрицания считаются циклом, без рекурсии"""
+        count = 0
+        while self.take('¬'):
+            count += 1
+        tree = operand()
+        for _ in range(count):
+            tree = self.nodes.not_(tree)
+        return tree
+
+
+def _parse_group(group, closing, nodes, errors):
+    """Дерево группы лексем (номер, лексема); при ошибке она копится в errors, а вместо дерева - константа"""
+    try:
+        return _Parser([token for _, token in group], [index for index, _ in group], nodes, closing).parse()
+    except FormulaError as error:
+        errors.append(error)
+        return ('const', 0)
+
+
+def parse(text):
+    """Разбирает формулу в дерево из кортежей"""
+    # скобки разбираются изнутри наружу: закрывающая скобка превращает свою группу в одну лексему.
+    # Ошибки всех групп копятся, сообщается самая левая - та же, что дал бы разбор слева направо
+    nodes = _Nodes()
+    errors = []
+    groups = [[]]
+    opened = []
+    for index, token in enumerate(tokenize(text)):
+        if token == ('op', '('):
+            groups.append([])
+            opened.append(index)
+        elif token == ('op', ')') and opened:
+            groups[-1].append((index, token))
+            tree = _parse_group(groups.pop(), token, nodes, errors)
+            groups[-1].append((opened.pop(), ('tree', tree)))
+        else:
+            if token[0] == 'end':
+                # незакрытые скобки: разбор группы сообщит, что ожидалась ')'
+                while opened:
+                    groups[-1].append((index, token))
+                    tree = _parse_group(groups.pop(), ('op', ')'), nodes, errors)
+                    groups[-1].append((opened.pop(), ('tree', tree)))
+            groups[-1].append((index, token))
+    tree = _parse_group(groups[0], ('end', None), nodes, errors)
+    if errors:
+        raise min(errors, key=lambda error: error.position)
+    return tree
+
+
+def postorder(tree):
+    """Узлы дерева без рекурсии, каждый после своих операндов; общий узел (один объект) - один раз"""
+    seen = set()
+    stack = [(tree, False)]
+    while stack:
+        node, ready = stack.pop()
+        if id(node) in seen:
+            continue
+        if ready or node[0] in ('var', 'const'):
+            seen.add(id(node))
+            yield node
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node[1:]))
+
+
+def variables_of(tree):
+    """Множество имён переменных формулы"""
+    names = set()
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node[0] == 'var':
+            names.add(node[1])
+        elif node[0] != 'const':
+            stack.extend(node[1:])
+    return names
+
+
+def compile_formula(tree, variables):
+    """
+    Собирает из дерева вычислитель: f(values, mask).
+    values - значения переменных в порядке variables, каждое - битовая маска строк (или 0/1 при mask = 1),
+    mask - маска всех строк. Результат - маска строк, где формула истинна.
+    Дерево переводится в линейную программу над ячейками (сначала переменные, затем узлы),
+    поэтому ни сборка, ни вычисление не рекурсивны.
+    """
+    position = {name: i for i, name in enumerate(variables)}
+    missing = variables_of(tree) - set(position)
+    if missing:
+        raise FormulaError(f"Неизвестная переменная: {', '.join(sorted(missing))}")
+
+    slot = {}
+    program = []
+    size = len(position)
+    for node in postorder(tree):
+        op = node[0]
+        if op == 'var':
+            slot[id(node)] = position[node[1]]
+            continue
+        if op == 'const':
+            program.append((op, size, node[1], 0))
+        else:
+            a = slot[id(node[1])]
+            program.append((op, size, a, slot[id(node[2])] if op != 'not' else a))
+        slot[id(node)] = size
+        size += 1
+    result = slot[id(tree)]
+    extra = [0] * (size - len(position))
+
+    def evaluate(values, mask):
+        cells = list(values) + extra
+        for op, dst, a, b in program:
+            if op == 'and':
+                cells[dst] = cells[a] & cells[b]
+            elif op == 'or':
+                cells[dst] = cells[a] | cells[b]
+            elif op == 'not':
+                cells[dst] = cells[a] ^ mask
+            elif op == 'xor':
+                cells[dst] = cells[a] ^ cells[b]
+            elif op == 'eq':
+                cells[dst] = cells[a] ^ cells[b] ^ mask
+            elif op == 'imp':
+                cells[dst] = (cells[a] ^ mask) | cells[b]
+            else:
+                cells[dst] = mask if a else 0
+        return cells[result]
+
+    return evaluate
+
+
+def variable_masks(n):
+    """
+    Маски столбцов переменных для таблицы из 2 ** n строк.
+    Бит r маски k равен значению k-й переменной в строке r (первая переменная - старший бит номера строки).
+    """
+    size = 1 << n
+    masks = []
+    for k in range(n):
+        half = 1 << (n - 1 - k)
+        mask = ((1 << half) - 1) << half
+        length = half << 1
+        # удваиваем период, пока не покроем все строки
+        while length < size:
+            mask |= mask << length
+            length <<= 1
+        masks.append(mask)
+    return masks
+
+
+def row_values(r, n):
+    """Значения n переменных в строке r таблицы (первая переменная - старший бит номера строки)"""
+    return [(r >> (n - 1 - v)) & 1 for v in range(n)]
+
+
+def iter_ones(mask):
+    """Номера единичных битов mask по возрастанию - номера строк упакованного множества строк"""
+    while mask:
+        low = mask & -mask
+        mask ^= low
+        yield low.bit_length() - 1
+
+
+@lru_cache(maxsize=8)
+def weight_masks(n):
+    """Маски строк таблицы из 2 ** n строк по числу единиц: бит r маски w - в номере r ровно w единиц"""
+    masks = [(1 << (1 << n)) - 1]
+    for column in variable_masks(n):
+        # строка с единицей в этом столбце переходит на вес выше
+        masks = [(masks[w] & ~column if w < len(masks) else 0) | (masks[w - 1] & column if w else 0)
+                 for w in range(len(masks) + 1)]
+    return tuple(masks)
+
+
+def iter_blocks(n, chunk_rows=CHUNK_ROWS, start=0, stop=None):
+    """
+    Значения n переменных блоками по chunk_rows строк, строки [start, stop):
+    тройки (номер первой строки блока, значения переменных целыми числами, маска блока).
+    В блоке старшие переменные постоянны, младшие - маски variable_masks; start и stop кратны размеру блока
+    """
+    if chunk_rows < 1 or chunk_rows & (chunk_rows - 1):
+        raise ValueError("Размер блока - степень двойки")
+    low = min(n, chunk_rows.bit_length() - 1)
+    size = 1 << low
+    full = (1 << size) - 1
+    masks = variable_masks(low)
+    for first in range(start, 1 << n if stop is None else stop, size):
+        high = first >> low
+        yield first, [full if (high >> (n - low - 1 - v)) & 1 else 0 for v in range(n - low)] + masks, full
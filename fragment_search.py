@@ -0,0 +1,161 @@
+"""
+Поиск строк таблицы для строк фрагмента - общая часть табличного Solver и диаграмм решений (bdd.FragmentMatcher).
+
+Столбцу фрагмента сначала разрешаются переменные с подходящей сигнатурой (сколько нулей и единиц
+при F = 0 и F = 1), затем допустимые переменные и множества строк сужаются друг другом
+до неподвижной точки, а строки фрагмента подбираются по очереди от меньшего номера строки к большему.
+
+По найденным строкам подстановки столбцов перебираются по возрастанию (_compatible, _indexes),
+первая из них - ответ в порядке полного перебора.
+
+Как хранятся множества строк, решает наследник (битовые маски или диаграммы), он задаёт
+variables, part_table и методы _candidate_rows, _weight_rows, _has_value, _distinct_rows, _iter_rows,
+column_signatures, _tick.
+Пустое множество строк - 0 в обоих случаях.
+"""
+from formula import row_values
+
+
+def has_matching(compatible, used=()):
+    """Можно ли выбрать каждому столбцу свою переменную из compatible, не занимая used (алгоритм Куна)"""
+    owner = {}
+
+    def augment(j, seen):
+        for v in compatible[j]:
+            if v in used or v in seen:
+                continue
+            seen.add(v)
+            if v not in owner or augment(owner[v], seen):
+                owner[v] = j
+                return True
+        return False
+
+    return all(augment(j, set()) for j in range(len(compatible)))
+
+
+class FragmentSearch:
+    def _domains(self):
+        """
+        Известные клетки по столбцам фрагмента и начальные допустимые переменные для заполненных столбцов.
+        :return: (known, domains) или None, если фрагмент заведомо не подходит
+        """
+        if not self.part_table:
+            return None
+        n = len(self.variables)
+        k = len(self.part_table[0]) - 1
+        if k > n or any(row[-1] not in (0, 1) for row in self.part_table):
+            return None
+        # Столбец фрагмента может быть переменной v, только если в таблице хватает таких строк
+        table_sig = self.column_signatures()
+        known = {}
+        domains = {}
+        for j in range(k):
+            known[j] = [(i, row[j]) for i, row in enumerate(self.part_table) if row[j] is not None]
+            sig = [0, 0, 0, 0]
+            for i, value in known[j]:
+                sig[2 * self.part_table[i][-1] + value] += 1
+            if known[j]:
+                domains[j] = [v for v in range(n) if all(a <= b for a, b in zip(sig, table_sig[v]))]
+        return known, domains
+
+    def _propagate(self, known, chosen, domains):
+        """
+        Сужает допустимые переменные столбцов и множества строк до неподвижной точки.
+        :param chosen: уже выбранные строки таблицы для первых строк фрагмента
+        :return: (множества строк для остальных строк фрагмента, домены столбцов) или None
+        """
+        n = len(self.variables)
+        while True:
+            candidates = []
+            for i in range(len(chosen), len(self.part_table)):
+                row = self.part_table[i]
+                # столбцы, где осталась одна переменная, задают известные биты строки;
+                # известное значение остальных должно найтись хотя бы в одной из их переменных
+                fixed = {}
+                reach = []
+                for j, domain in domains.items():
+                    if row[j] is None:
+                        continue
+                    if len(domain) == 1:
+                        fixed[domain[0]] = row[j]
+                    else:
+                        reach.append((domain, row[j]))
+                # число единиц в строке таблицы от подстановки столбцов не зависит: известных единиц
+                # и нулей строки фрагмента в ней должно хватить, иначе строка отсекается до ветвления
+                weight = self._weight_rows(row[:-1].count(1), n - row[:-1].count(0))
+                rows = self._candidate_rows(row[-1], fixed, reach, chosen, weight)
+                if not rows:
+                    return None
+                candidates.append(rows)
+            values = [row_values(r, n) for r in chosen]
+            narrowed = {}
+            changed = False
+            for j, domain in domains.items():
+                kept = [v for v in domain if all(
+                    values[i][v] == c if i < len(chosen) else self._has_value(candidates[i - len(chosen)], v, c)
+                    for i, c in known[j])]
+                if not kept:
+                    return None
+                changed |= len(kept) < len(domain)
+                narrowed[j] = kept
+            domains = narrowed
+            if not changed:
+                break
+        if not has_matching(list(domains.values())):
+            return None
+        if not self._distinct_rows(candidates, chosen):
+            return None
+        return candidates, domains
+
+    def _row_tuples(self):
+        """
+        Наборы строк таблицы для строк фрагмента, для которых есть хотя бы одна подстановка столбцов.
+        Строки фрагмента подбираются по очереди, каждая - от меньшего номера строки таблицы к большему,
+        поэтому наборы идут в том же порядке, что и в полном переборе.
+        :return: генератор пар (строки, known)
+        """
+        start = self._domains()
+        if start is None:
+            return
+        known, domains = start
+        n = len(self.variables)
+        m = len(self.part_table)
+
+        def search(chosen, domains):
+            self._tick()
+            state = self._propagate(known, chosen, domains)
+            if state is None:
+                return
+            if len(chosen) == m:
+                yield tuple(chosen)
+                return
+            candidates, domains = state
+            i = len(chosen)
+            for r in self._iter_rows(candidates[0]):
+                values = row_values(r, n)
+                fixed = {j: [v for v in domain if self.part_table[i][j] is None
+                             or values[v] == self.part_table[i][j]]
+                         for j, domain in domains.items()}
+                yield from search(chosen + [r], fixed)
+
+        for rows in search([], domains):
+            yield rows, known
+
+    def _compatible(self, rows, known):
+        """Для каждого столбца фрагмента - переменные, совпадающие с ним во всех выбранных строках"""
+        n = len(self.variables)
+        values = [row_values(r, n) for r in rows]
+        return [[v for v in range(n) if all(values[i][v] == c for i, c in cells)]
+                for j, cells in sorted(known.items())]
+
+    def _indexes(self, compatible, index):
+        """Подстановки столбцов по возрастанию; ветки без паросочетания для остатка отсекаются"""
+        j = len(index)
+        if j == len(compatible):
+            yield tuple(index)
+            return
+        for v in compatible[j]:
+            if v not in index and has_matching(compatible[j + 1:], set(index) | {v}):
+                index.append(v)
+                yield from self._indexes(compatible, index)
+                index.pop()
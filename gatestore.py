@@ -0,0 +1,313 @@
+"""
+Компактное хранение больших схем: миллион элементов без миллиона объектов Python.
+
+Схема - столбцы: ops (bytearray, коды операций netlist), src1/src2 (array, номера проводов-операндов),
+values (bytearray, значения проводов). Провод i - выход элемента i; входы схемы - элементы с кодом INPUT,
+константы - с кодом CONST (значение хранится в values). Третий вход mux (выбор) - в словаре select,
+чтобы не держать третий столбец ради редкого элемента.
+Операнды всегда добавлены раньше элемента, поэтому порядок добавления уже топологический
+и схема вычисляется одним проходом по столбцам. На элемент - 18 байт вместо сотен у объекта TLogElement.
+
+    store = GateStore()
+    a, b = store.add_inputs(2)
+    x = store.add_gate('and', a, b)
+    store.evaluate([1, 1])
+    store.gate(x).Res                  # лёгкий вид элемента с интерфейсом In1/In2/Res
+
+Элементы одного слоя добавляются одним вызовом, без объекта на элемент:
+    store.add_gates('and', [a, a], [b, x])    -> range номеров новых элементов
+Бит-параллельное вычисление и таблицы истинности - как у netlist.Circuit (simulate, truth_table).
+"""
+from array import array
+
+from netlist import NOT, AND, OR, BUF, XOR, MUX, OPS, CHUNK_ROWS, chunked_table
+
+INPUT, CONST = 6, 7
+NAMES = {code: name for name, code in OPS.items()}
+NAMES[INPUT] = 'input'
+NAMES[CONST] = 'const'
+
+
+class GateStore:
+    __slots__ = ('ops', 'src1', 'src2', 'select', 'values', 'inputs', 'dirty')
+
+    def __init__(self):
+        self.ops = bytearray()
+        self.src1 = array('l')
+        self.src2 = array('l')
+        # провод mux -> провод его выбора
+        self.select = {}
+        self.values = bytearray()
+        # номера проводов-входов схемы в порядке добавления
+        self.inputs = array('l')
+        # входы менялись после последнего вычисления
+        self.dirty = False
+
+    @classmethod
+    def from_circuit(cls, circuit):
+        """Хранилище по скомпилированной схеме netlist.Circuit: входы - в порядке circuit.inputs"""
+        store = cls()
+        net = list(store.add_inputs(circuit.first)) + [None] * (circuit.size - circuit.first)
+        for op, dst, a, b in zip(circuit.ops, circuit.dst, circuit.src1, circuit.src2):
+            net[dst] = store._append(op, net[a], net[b])
+            if op == MUX:
+                store.select[net[dst]] = net[circuit.select[dst]]
+        return store
+
+    @staticmethod
+    def circuit_nets(circuit, elements):
+        """Провода элементов схемы circuit в хранилище from_circuit(circuit)"""
+        # from_circuit добавляет элементы после входов в порядке программы Circuit
+        position = {dst - circuit.first: k for k, dst in enumerate(circuit.dst)}
+        return [circuit.first + position[circuit.index[id(el)]] for el in elements]
+
+    def __len__(self):
+        return len(self.ops)
+
+    def _append(self, code, a, b):
+        self.ops.append(code)
+        self.src1.append(a)
+        self.src2.append(b)
+        self.values.append(0)
+        self.dirty = True
+        return len(self.ops) - 1
+
+    def add_input(self):
+        net = self._append(INPUT, 0, 0)
+        # вход ссылается сам на себя: у провода нет операндов
+        self.src1[net] = self.src2[net] = net
+        self.inputs.append(net)
+        return net
+
+    def add_const(self, value):
+        net = self._append(CONST, 0, 0)
+        self.src1[net] = self.src2[net] = net
+        self.values[net] = 1 if value else 0
+        return net
+
+    def add_inputs(self, count):
+        first = len(self.ops)
+        for _ in range(count):
+            self.add_input()
+        return range(first, len(self.ops))
+
+    def _code(self, op, b, select):
+        if op not in OPS:
+            raise ValueError(f"Неизвестный элемент: {op!r}")
+        code = OPS[op]
+        arity = 1 if code in (NOT, BUF) else 3 if code == MUX else 2
+        given = 1 + (b is not None) + (select is not None)
+        if given != arity or (b is None and select is not None):
+            raise ValueError(f"Элементу {op!r} нужно входов: {arity}")
+        return code
+
+    def add_gate(self, op, a, b=None, select=None):
+        """
+        Новый элемент op ('not', 'buf', 'and', 'or', 'xor', 'mux') с выходами проводов a и b на входах;
+        номер его провода. У mux выход - b при select = 1, иначе a
+        """
+        code = self._code(op, b, select)
+        b = a if b is None else b
+        if not all(0 <= net < len(self.ops) for net in (a, b, a if select is None else select)):
+            raise IndexError("Вход элемента - ещё не добавленный провод")
+        net = self._append(code, a, b)
+        if select is not None:
+            self.select[net] = select
+        return net
+
+    def add_gates(self, op, a, b=None, select=None):
+        """Пачка элементов op: i-й получает на входы провода a[i], b[i] (и select[i] у mux); range номеров новых проводов"""
+        code = self._code(op, b, select)
+        first = len(self.ops)
+        a = array('l', a)
+        b = a if b is None else array('l', b)
+        select = a if select is None else array('l', select)
+        if not len(a) == len(b) == len(select):
+            raise ValueError("Разная длина списков входов")
+        if a and (min(min(a), min(b), min(select)) < 0 or max(max(a), max(b), max(select)) >= first):
+            raise IndexError("Вход элемента - ещё не добавленный провод")
+        self.ops.extend(bytes([code]) * len(a))
+        self.src1.extend(a)
+        self.src2.extend(b)
+        if code == MUX:
+            self.select.update(zip(range(first, first + len(a)), select))
+        self.values.extend(bytes(len(a)))
+        self.dirty = True
+        return range(first, len(self.ops))
+
+    def set_input(self, net, value):
+        if self.ops[net] != INPUT:
+            raise ValueError(f"Провод {net} - не вход схемы")
+        self.values[net] = 1 if value else 0
+        self.dirty = True
+
+    def evaluate(self, values=None):
+        """Вычисляет все провода; values - значения входов в порядке inputs (None - оставить текущие)"""
+        v = self.values
+        if values is not None:
+            if len(values) != len(self.inputs):
+                raise ValueError(f"Нужно значений входов: {len(self.inputs)}")
+            for net, value in zip(self.inputs, values):
+                v[net] = 1 if value else 0
+        for i, (op, a, b) in enumerate(zip(self.ops, self.src1, self.src2)):
+            if op == AND:
+                v[i] = v[a] & v[b]
+            elif op == OR:
+                v[i] = v[a] | v[b]
+            elif op == XOR:
+                v[i] = v[a] ^ v[b]
+            elif op == NOT:
+                v[i] = v[a] ^ 1
+            elif op == BUF:
+                v[i] = v[a]
+            elif op == MUX:
+                v[i] = v[b] if v[self.select[i]] else v[a]
+        self.dirty = False
+        return v
+
+    def value(self, net):
+        if self.dirty:
+            self.evaluate()
+        return bool(self.values[net])
+
+    def simulate(self, words, mask):
+        """Бит-параллельный проход: words - значения входов (в порядке inputs) целыми числами, бит k - k-й набор"""
+        if len(words) != len(self.inputs):
+            raise ValueError(f"Нужно значений входов: {len(self.inputs)}")
+        state = [0] * len(self.ops)
+        for net, word in zip(self.inputs, words):
+            state[net] = word & mask
+        for i, (op, a, b) in enumerate(zip(self.ops, self.src1, self.src2)):
+            if op == AND:
+                state[i] = state[a] & state[b]
+            elif op == OR:
+                state[i] = state[a] | state[b]
+            elif op == XOR:
+                state[i] = state[a] ^ state[b]
+            elif op == NOT:
+                state[i] = state[a] ^ mask
+            elif op == BUF:
+                state[i] = state[a]
+            elif op == MUX:
+                state[i] = state[a] ^ ((state[a] ^ state[b]) & state[self.select[i]])
+            elif op == CONST:
+                state[i] = mask if self.values[i] else 0
+        return state
+
+    def truth_table(self, nets, chunk_rows=CHUNK_ROWS):
+        """Упакованные столбцы проводов nets по всем наборам входов, бит r - строка r (первый вход - старший бит)"""
+        return chunked_table(self.simulate, len(self.inputs), list(nets), chunk_rows)
+
+    def gate_count(self):
+        """Число элементов без входов схемы и констант"""
+        return len(self.ops) - self.ops.count(INPUT) - self.ops.count(CONST)
+
+    def depth(self, nets=None):
+        """Наибольшее число элементов на пути от входа до проводов nets (по умолчанию - до любого провода)"""
+        level = array('l', [0]) * len(self.ops)
+        for i, (op, a, b) in enumerate(zip(self.ops, self.src1, self.src2)):
+            if op == MUX:
+                level[i] = max(level[a], level[b], level[self.select[i]]) + 1
+            elif op not in (INPUT, CONST):
+                level[i] = max(level[a], level[b]) + 1
+        return max((level[net] for net in (range(len(self.ops)) if nets is None else nets)), default=0)
+
+    def live(self, nets):
+        """Провода, от которых зависит хоть один из проводов nets (включая их самих)"""
+        live = set()
+        stack = list(nets)
+        while stack:
+            net = stack.pop()
+            if net not in live:
+                live.add(net)
+                if self.ops[net] not in (INPUT, CONST):
+                    stack.extend((self.src1[net], self.src2[net]))
+                if self.ops[net] == MUX:
+                    stack.append(self.select[net])
+        return live
+
+    def gate(self, net):
+        return Gate(self, net)
+
+    def nbytes(self):
+        """Память столбцов, байт"""
+        return sum(len(column) * getattr(column, 'itemsize', 1)
+                   for column in (self.ops, self.src1, self.src2, self.values, self.inputs))
+
+
+class Gate:
+    """Вид элемента хранилища с интерфейсом TLogElement: создаётся по запросу, своих данных не держит"""
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def op(self):
+        return NAMES[self.store.ops[self.index]]
+
+    def __setIn1(self, value):
+        self.store.set_input(self.index, value)
+
+    In1 = property(lambda x: x.store.value(x.store.src1[x.index]), __setIn1)
+    In2 = property(lambda x: x.store.value(x.store.src2[x.index]))
+    In3 = property(lambda x: x.store.value(x.store.select[x.index]))
+    Res = property(lambda x: x.store.value(x.index))
+
+    def __repr__(self):
+        return f"Gate({self.op}, {self.index})"
+
+
+def full_adder(store, a, b, carry):
+    """Полный сумматор из xor/and/or: провода (сумма, перенос)"""
+    half = store.add_gate('xor', a, b)
+    total = store.add_gate('xor', half, carry)
+    out = store.add_gate('or', store.add_gate('and', a, b), store.add_gate('and', half, carry))
+    return total, out
+
+
+def adder(store, a, b):
+    """Сумматор с последовательным переносом: a, b - провода разрядов (младший первый); провода суммы"""
+    if len(a) != len(b):
+        raise ValueError("Разная разрядность слагаемых")
+    out = []
+    carry = None
+    for x, y in zip(a, b):
+        if carry is None:
+            total, carry = store.add_gate('xor', x, y), store.add_gate('and', x, y)
+        else:
+            total, carry = full_adder(store, x, y, carry)
+        out.append(total)
+    return out + [carry]
+
+
+def multiplier(store, a, b):
+    """Умножитель столбиком: частичные произведения - одним слоем add_gates, затем сумматоры; провода произведения"""
+    width = len(a)
+    # частичное произведение i: a[j] and b[i] для всех j
+    products = store.add_gates('and', list(a) * len(b), [y for y in b for _ in range(width)])
+    rows = [list(products[i * width:(i + 1) * width]) for i in range(len(b))]
+    result = [rows[0][0]]
+    acc = rows[0][1:]
+    for row in rows[1:]:
+        # сумма старших разрядов накопленного и очередной строки; младший разряд суммы готов
+        if not acc:
+            total = row
+        elif len(acc) < width:
+            total = _extend(store, adder(store, acc, row[:len(acc)]), row[len(acc):])
+        else:
+            total = adder(store, acc, row)
+        result.append(total[0])
+        acc = total[1:]
+    return result + acc
+
+
+def _extend(store, total, rest):
+    # перенос доходит до старших разрядов строки, которых нет в накопленном
+    carry = total[-1]
+    out = total[:-1]
+    for x in rest:
+        out.append(store.add_gate('xor', x, carry))
+        carry = store.add_gate('and', x, carry)
+    return out + [carry]
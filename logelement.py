@@ -1,59 +1,170 @@
+from collections import deque
+
+
 class TLogElement:
-    def __init__(self):
-        self.__in1 = False
-        self.__in2 = False
+    # Очередь событий: элементы, у которых изменился вход. Элемент пересчитывается, только если
+    # его вход действительно изменился, а дальше сигнал идёт, только если изменился выход
+    _events = deque()
+    _running = False
+    # сколько раз пересчитывались элементы - видно, сколько работы сэкономлено
+    evaluations = 0
+    # без __dict__: у элемента только входы, выход и список связей.
+    # Для схем в миллионы элементов - gatestore.GateStore
+    __slots__ = ("_ins", "_res", "__links")
+
+    def __init__(self, inputs=2):
+        # значения входов: _ins[k - 1] - вход номер k
+        self._ins = [False] * inputs
         self._res = False
         if not hasattr(self, "calc"):
             raise NotImplementedError("Нельзя создать такой объект.")
-        self.__nextEl = None
-        self.__nextIn = 0
-    def __setIn1(self, newIn1):
-        self.__in1 = newIn1
+        # выход может идти на несколько входов: список пар (элемент, номер входа)
+        self.__links = []
         self.calc()
-        if self.__nextEl:
-            if self.__nextIn == 1:
-                self.__nextEl.In1 = self._res
-            elif self.__nextIn == 2:
-                self.__nextEl.In2 = self._res
-
-    def __setIn2(self, newIn2):
-        self.__in2=newIn2
-        self.calc()
-        # используется, но не реализуется
-        if self.__nextEl:
-            if self.__nextIn == 1:
-                self.__nextEl.In1 = self._res
-            elif self.__nextIn == 2:
-                self.__nextEl.In2 = self._res
-        # я добавила по аналогии с __setIn1, без этого куска не работало
+    def getIn(self, k):
+        return self._ins[k - 1]
+    def setIn(self, k, value):
+        if not 1 <= k <= len(self._ins):
+            raise ValueError(f"У элемента {type(self).__name__} нет входа {k}")
+        if self._ins[k - 1] != value:
+            self._ins[k - 1] = value
+            self.__schedule()
+
+    def __schedule(self):
+        events = TLogElement._events
+        events.append(self)
+        # присваивание входа изнутри обработки только добавляет событие в очередь
+        if TLogElement._running:
+            return
+        TLogElement._running = True
+        try:
+            while events:
+                el = events.popleft()
+                old = el._res
+                el.calc()
+                TLogElement.evaluations += 1
+                if bool(el._res) == bool(old):
+                    continue
+                for nextEl, nextIn in el.__links:
+                    ins = nextEl._ins
+                    if ins[nextIn - 1] != el._res:
+                        ins[nextIn - 1] = el._res
+                        events.append(nextEl)
+        finally:
+            events.clear()
+            TLogElement._running = False
     def link(self, nextEl, nextIn):
-        self.__nextEl = nextEl
-        self.__nextIn = nextIn
-    In1 = property(lambda x: x.__in1, __setIn1)
-    In2 = property(lambda x: x.__in2, __setIn2)
+        if not 1 <= nextIn <= nextEl.arity:
+            raise ValueError(f"У элемента {type(nextEl).__name__} нет входа {nextIn}")
+        if (nextEl, nextIn) not in self.__links:
+            self.__links.append((nextEl, nextIn))
+        # вход сразу получает текущее значение выхода
+        nextEl.setIn(nextIn, self._res)
+    def links(self):
+        # куда подаётся выход: список пар (элемент, номер входа) - нужен компилятору схем (netlist.py)
+        return list(self.__links)
+    def load(self, ins, res):
+        # состояние, посчитанное скомпилированной схемой: записывается без пересчёта и передачи дальше
+        self._ins[:] = ins
+        self._res = res
+    arity = property(lambda x: len(x._ins))
+    In1 = property(lambda x: x._ins[0], lambda x, v: x.setIn(1, v))
+    In2 = property(lambda x: x._ins[1], lambda x, v: x.setIn(2, v))
+    In3 = property(lambda x: x._ins[2], lambda x, v: x.setIn(3, v))
     Res = property(lambda x: x._res)
 
 
 class TNot(TLogElement):
+    __slots__ = ()
+    op = "not"
     def __init__(self):
-        TLogElement.__init__(self)
+        TLogElement.__init__(self, 1)
     def calc(self):
-        self._res = not self.In1
+        self._res = not self._ins[0]
+
+
+class TInput(TLogElement):
+    __slots__ = ()
+    # вход схемы: выход повторяет In1 и может идти сразу на несколько элементов
+    op = "buf"
+    def __init__(self):
+        TLogElement.__init__(self, 1)
+    def calc(self):
+        self._res = self._ins[0]
 
 
 class TLog2In(TLogElement):
-    pass
+    # элементы с двумя и более входами: число входов задаётся при создании, по умолчанию 2
+    __slots__ = ()
+    def __init__(self, inputs=2):
+        if inputs < 2:
+            raise ValueError("Нужно не меньше двух входов")
+        TLogElement.__init__(self, inputs)
 
 
 class TAnd(TLog2In):
-    def __init__(self):
-        TLog2In.__init__(self)
+    __slots__ = ()
+    op = "and"
+    def __init__(self, inputs=2):
+        TLog2In.__init__(self, inputs)
     def calc(self):
-        self._res = self.In1 and self.In2
+        self._res = all(self._ins)
 
 
 class TOr(TLog2In):
+    __slots__ = ()
+    op = "or"
+    def __init__(self, inputs=2):
+        TLog2In.__init__(self, inputs)
+    def calc(self):
+        self._res = any(self._ins)
+
+
+class TNand(TLog2In):
+    __slots__ = ()
+    op = "nand"
+    def __init__(self, inputs=2):
+        TLog2In.__init__(self, inputs)
+    def calc(self):
+        self._res = not all(self._ins)
+
+
+class TNor(TLog2In):
+    __slots__ = ()
+    op = "nor"
+    def __init__(self, inputs=2):
+        TLog2In.__init__(self, inputs)
+    def calc(self):
+        self._res = not any(self._ins)
+
+
+class TXor(TLog2In):
+    # истина при нечётном числе единиц на входах
+    __slots__ = ()
+    op = "xor"
+    def __init__(self, inputs=2):
+        TLog2In.__init__(self, inputs)
+    def calc(self):
+        res = False
+        for value in self._ins:
+            if value:
+                res = not res
+        self._res = res
+
+
+class TXnor(TXor):
+    __slots__ = ()
+    op = "xnor"
+    def calc(self):
+        TXor.calc(self)
+        self._res = not self._res
+
+
+class TMux(TLogElement):
+    # мультиплексор: In3 - выбор; при In3 = 0 выход повторяет In1, при In3 = 1 - In2
+    __slots__ = ()
+    op = "mux"
     def __init__(self):
-        TLog2In.__init__(self)
+        TLogElement.__init__(self, 3)
     def calc(self):
-        self._res = self.In1 or self.In2
+        self._res = self._ins[1] if self._ins[2] else self._ins[0]
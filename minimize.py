@@ -0,0 +1,242 @@
+"""
+Минимизация булевых функций по таблице истинности Solver (метод Квайна - Мак-Класки).
+
+Импликанта - пара битовых масок (value, free): free - переменные, которых нет в импликанте,
+value - значения остальных (номер строки, первая переменная - старший бит).
+Склеивание идёт по группам с одинаковым free через поиск соседа в множестве, без попарного сравнения.
+Покрытие: существенные импликанты, отбрасывание доминируемых строк и столбцов таблицы покрытия,
+затем точный перебор с отсечением по нижней оценке; стоимость - число слагаемых, затем литералов.
+Для больших функций перебор ограничен EXACT_NODES узлами и начинается с жадного покрытия,
+так что результат всегда есть, но минимальность гарантирована, только если перебор успел закончиться.
+Простые импликанты и покрытия запоминаются между вызовами (по столбцу F).
+
+Результат - строка формулы в записи ¬ ∧ ∨, которую снова читает formula.parse:
+    minimize(solver.create_whole_table(), solver.variables)          -> "(x ∧ ¬y) ∨ z"
+    minimize(solver.create_whole_table(), solver.variables, 'pos')   -> "(x ∨ z) ∧ (¬y ∨ z)"
+"""
+from functools import lru_cache
+
+from formula import iter_ones
+
+FORMS = ('sop', 'pos')
+# предел узлов точного перебора покрытия; дальше берётся лучшее найденное покрытие
+EXACT_NODES = 20000
+
+
+def packed_from_table(table):
+    """Столбец F таблицы create_whole_table одним числом: бит r - значение F в строке r"""
+    packed = 0
+    for r, row in enumerate(table):
+        if row[-1]:
+            packed |= 1 << r
+    return packed
+
+
+@lru_cache(maxsize=1024)
+def prime_implicants(n, packed):
+    """Простые импликанты функции n переменных со столбцом F packed: кортеж пар (value, free)"""
+    groups = {0: set(iter_ones(packed))}
+    primes = []
+    while groups:
+        merged = {}
+        for free, terms in groups.items():
+            used = set()
+            for value in terms:
+                for v in range(n):
+                    bit = 1 << v
+                    # склеиваем value и его соседа по свободной переменной bit, каждую пару - один раз
+                    if free & bit or value & bit or value | bit not in terms:
+                        continue
+                    merged.setdefault(free | bit, set()).add(value)
+                    used.add(value)
+                    used.add(value | bit)
+            primes.extend((value, free) for value in terms if value not in used)
+        groups = merged
+    return tuple(sorted(primes, key=lambda term: (term[1], term[0])))
+
+
+def covered_rows(term, n):
+    """Маска строк таблицы, покрытых импликантой"""
+    value, free = term
+    rows = 0
+    sub = free
+    # перебор всех подмасок free
+    while True:
+        rows |= 1 << (value | sub)
+        if not sub:
+            break
+        sub = (sub - 1) & free
+    return rows
+
+
+def _free_count(term):
+    return bin(term[1]).count('1')
+
+
+def _rows_terms(cover, remaining):
+    """Для каждой непокрытой строки - множество импликант, которые её покрывают"""
+    rows_terms = {}
+    for term, rows in cover.items():
+        for r in iter_ones(rows & remaining):
+            rows_terms.setdefault(r, set()).add(term)
+    return rows_terms
+
+
+def _cost(terms, n):
+    return len(terms), sum(n - _free_count(term) for term in terms)
+
+
+@lru_cache(maxsize=1024)
+def minimal_cover(n, packed):
+    """Минимальное покрытие единиц функции простыми импликантами: кортеж пар (value, free)"""
+    if not packed:
+        return ()
+    primes = prime_implicants(n, packed)
+    cover = {term: covered_rows(term, n) for term in primes}
+    chosen = []
+    remaining = packed
+    while remaining:
+        rows_terms = _rows_terms(cover, remaining)
+        # существенные импликанты: единственные, что покрывают какую-то строку
+        essential = {next(iter(terms)) for terms in rows_terms.values() if len(terms) == 1}
+        for term in essential:
+            chosen.append(term)
+            remaining &= ~cover.pop(term)
+        if essential:
+            continue
+        # доминирование строк таблицы покрытия: импликанта, покрывающая часть строк другой и не дешевле её, лишняя
+        order = sorted(cover, key=lambda t: (-(cover[t] & remaining).bit_count(), _free_count(t)))
+        dropped = False
+        for i, term in enumerate(order):
+            rows = cover[term] & remaining
+            if not rows or any(other in cover and not rows & ~cover[other] and _free_count(other) >= _free_count(term)
+                               for other in order[:i]):
+                del cover[term]
+                dropped = True
+        if not dropped:
+            break
+    if remaining:
+        # доминирование столбцов: строку, чьи импликанты включают все импликанты другой строки, покрывать отдельно не надо
+        rows_terms = _rows_terms(cover, remaining)
+        needed = 0
+        for r, terms in rows_terms.items():
+            if not any(a != r and rows_terms[a] <= terms and (rows_terms[a] != terms or a < r) for a in rows_terms):
+                needed |= 1 << r
+        chosen.extend(_exact_cover(cover, needed, n))
+    return tuple(sorted(chosen, key=lambda term: _literal_key(term, n)))
+
+
+def _greedy_cover(cover, needed, n):
+    """Жадное покрытие: импликанта с наибольшим числом новых строк (при равенстве - короче), затем лишние убираются"""
+    chosen = []
+    rest = needed
+    while rest:
+        term = max(cover, key=lambda t: ((cover[t] & rest).bit_count(), _free_count(t)))
+        chosen.append(term)
+        rest &= ~cover[term]
+    for term in sorted(chosen, key=_free_count):
+        others = 0
+        for other in chosen:
+            if other != term:
+                others |= cover[other]
+        if not needed & ~others:
+            chosen.remove(term)
+    return tuple(chosen)
+
+
+def _exact_cover(cover, needed, n):
+    """
+    Наименьшее по (слагаемые, литералы) покрытие строк needed: перебор с отсечением по нижней оценке.
+    Если за EXACT_NODES узлов перебор не закончен, остаётся лучшее найденное (начинается с жадного).
+    """
+    terms = sorted(cover, key=lambda t: (-(cover[t] & needed).bit_count(), -_free_count(t)))
+    # для строки - маска номеров импликант, которые её покрывают
+    row_terms = {r: sum(1 << i for i, t in enumerate(terms) if cover[t] >> r & 1) for r in iter_ones(needed)}
+    best = _greedy_cover(cover, needed, n)
+    best_cost = _cost(best, n)
+    nodes = 0
+
+    def lower_bound(rest):
+        # строки с непересекающимися множествами импликант требуют разных слагаемых
+        count = 0
+        taken = 0
+        for r in sorted(iter_ones(rest), key=lambda r: row_terms[r].bit_count()):
+            if not row_terms[r] & taken:
+                count += 1
+                taken |= row_terms[r]
+        return count
+
+    def search(rest, chosen, literals):
+        nonlocal best, best_cost, nodes
+        nodes += 1
+        if nodes > EXACT_NODES:
+            return
+        if not rest:
+            if (len(chosen), literals) < best_cost:
+                best, best_cost = tuple(chosen), (len(chosen), literals)
+            return
+        if (len(chosen) + lower_bound(rest), literals) >= best_cost:
+            return
+        # ветвимся по строке с наименьшим числом покрывающих импликант
+        row = min(iter_ones(rest), key=lambda r: row_terms[r].bit_count())
+        for i in iter_ones(row_terms[row]):
+            term = terms[i]
+            chosen.append(term)
+            search(rest & ~cover[term], chosen, literals + n - _free_count(term))
+            chosen.pop()
+
+    search(needed, [], 0)
+    return best
+
+
+def _literal_key(term, n):
+    value, free = term
+    return [(0 if free >> (n - 1 - v) & 1 else 1, -(value >> (n - 1 - v) & 1)) for v in range(n)]
+
+
+def _literals(term, variables, negate=False):
+    n = len(variables)
+    value, free = term
+    out = []
+    for v, name in enumerate(variables):
+        bit = 1 << (n - 1 - v)
+        if not free & bit:
+            positive = bool(value & bit) != negate
+            out.append(name if positive else f"¬{name}")
+    return out
+
+
+def _join(groups, inner, outer):
+    parts = []
+    for literals in groups:
+        text = f" {inner} ".join(literals)
+        parts.append(f"({text})" if len(literals) > 1 and len(groups) > 1 else text)
+    return f" {outer} ".join(parts)
+
+
+def minimize_packed(packed, variables, form='sop'):
+    """
+    Минимальная ДНФ (form="sop") или КНФ (form="pos") функции со столбцом F packed.
+    :return: строка формулы для formula.parse
+    """
+    if form not in FORMS:
+        raise ValueError(f"Неизвестная форма: {form!r}")
+    n = len(variables)
+    full = (1 << (1 << n)) - 1
+    if form == 'sop':
+        if packed == full:
+            return "1"
+        terms = minimal_cover(n, packed)
+        return _join([_literals(term, variables) for term in terms], '∧', '∨') if terms else "0"
+    # КНФ: минимальная ДНФ отрицания, каждое слагаемое превращается в дизъюнкцию отрицаний литералов
+    if not packed:
+        return "0"
+    terms = minimal_cover(n, full ^ packed)
+    return _join([_literals(term, variables, negate=True) for term in terms], '∨', '∧') if terms else "1"
+
+
+def minimize(table, variables, form='sop'):
+    """Минимальная формула по таблице Solver.create_whole_table"""
+    if len(table) != 1 << len(variables):
+        raise ValueError("Размер таблицы не совпадает с числом переменных")
+    return minimize_packed(packed_from_table(table), variables, form)
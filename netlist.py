@@ -0,0 +1,228 @@
+"""
+Компилятор схем из элементов logelement (TInput, TNot, TAnd, TOr, TNand, TNor, TXor, TXnor, TMux)
+в плоскую схему по уровням.
+
+Элементы и связи link() остаются способом описать схему. Circuit обходит связи,
+раскладывает элементы по уровням (уровень элемента - на один больше, чем у самого глубокого
+элемента на его входах; входы схемы - уровень 0) и вычисляет всю схему одним проходом
+по массивам, без рекурсивных вызовов свойств In1/In2.
+
+Программа прохода состоит из операций not, buf, and, or, xor над двумя операндами и mux
+(третий операнд - выбор, хранится в словаре select по месту записи): многовходовые and/or/xor
+раскладываются на цепочки, nand, nor, xnor - на цепочку и not.
+Состояние - bytearray: сначала входы схемы (свободные входы элементов, в порядке inputs),
+затем выходы элементов (в порядке elements), затем промежуточные провода составных элементов.
+
+    circuit = Circuit([elNot1, elNot2, elAnd1, elAnd2, elOr])
+    circuit.run([1, 0, 1, 0])      # значения входов; In1/In2/Res элементов обновляются
+    elOr.Res
+
+Бит-параллельный режим: значение каждого провода - целое число, бит k - k-й набор входов,
+так что одна операция & | ^ над числами вычисляет элемент сразу на тысячах наборов.
+truth_table() строит таблицу истинности выходов по всем 2 ** n наборам блоками по chunk_rows строк:
+    circuit.truth_table()          -> [0b0110]    # столбец F выхода elOr, бит r - строка r
+Строка r - как в Solver: первый вход схемы - старший бит номера строки.
+"""
+from array import array
+
+from formula import CHUNK_ROWS, iter_blocks
+
+NOT, AND, OR, BUF, XOR, MUX = 0, 1, 2, 3, 4, 5
+OPS = {'not': NOT, 'and': AND, 'or': OR, 'buf': BUF, 'xor': XOR, 'mux': MUX}
+# операции элементов logelement, которые понимает компилятор
+GATES = ('not', 'buf', 'and', 'or', 'nand', 'nor', 'xor', 'xnor', 'mux')
+
+
+def chunked_table(simulate, n, slots, chunk_rows=CHUNK_ROWS):
+    """
+    Упакованные столбцы проводов slots по всем 2 ** n наборам входов.
+    simulate(words, mask) - бит-параллельный проход схемы, возвращает значения проводов
+    """
+    columns = [0] * len(slots)
+    for first, words, full in iter_blocks(n, chunk_rows):
+        state = simulate(words, full)
+        for i, slot in enumerate(slots):
+            columns[i] |= state[slot] << first
+    return columns
+
+
+class Circuit:
+    def __init__(self, elements):
+        # все элементы, достижимые по связям: сначала переданные, в том же порядке
+        self.elements = []
+        self.index = {}
+        for el in elements:
+            self._add(el)
+        for el in self.elements:
+            for target, _ in el.links():
+                self._add(target)
+        count = len(self.elements)
+
+        # кто подаёт сигнал на каждый вход: номер элемента или None - вход схемы
+        drivers = [[None] * el.arity for el in self.elements]
+        for g, el in enumerate(self.elements):
+            for target, k in el.links():
+                drivers[self.index[id(target)]][k - 1] = g
+        self.inputs = []
+        slots = []
+        for g, el in enumerate(self.elements):
+            row = []
+            for k in range(el.arity):
+                if drivers[g][k] is None:
+                    row.append(len(self.inputs))
+                    self.inputs.append((el, k + 1))
+                else:
+                    row.append(None)
+            slots.append(row)
+        first = len(self.inputs)
+
+        # уровни: алгоритм Кана по связям элементов
+        fanin = [sum(d is not None for d in drivers[g]) for g in range(count)]
+        self.level = array('l', [0] * count)
+        ready = [g for g in range(count) if not fanin[g]]
+        order = []
+        while ready:
+            g = ready.pop()
+            order.append(g)
+            for target, _ in self.elements[g].links():
+                t = self.index[id(target)]
+                self.level[t] = max(self.level[t], self.level[g] + 1)
+                fanin[t] -= 1
+                if not fanin[t]:
+                    ready.append(t)
+        if len(order) != count:
+            raise ValueError("Схема содержит цикл")
+        order.sort(key=lambda g: self.level[g])
+        self.depth = max(self.level, default=-1) + 1
+
+        # программа прохода: код операции, куда писать и откуда брать операнды (индексы в состоянии)
+        self.ops = bytearray()
+        self.dst = array('l')
+        self.src1 = array('l')
+        self.src2 = array('l')
+        # выбор mux: место записи -> индекс провода выбора
+        self.select = {}
+        self.first = first
+        # размер состояния: промежуточные провода добавляются после выходов элементов
+        self.size = first + count
+        for g in order:
+            sources = [first + d if d is not None else slots[g][k] for k, d in enumerate(drivers[g])]
+            self._emit(self.elements[g].op, sources, first + g)
+        # выходы схемы - элементы, выход которых никуда не подаётся
+        self.outputs = [el for el in self.elements if not el.links()]
+
+    def _add(self, el):
+        if id(el) in self.index:
+            return
+        if getattr(el, 'op', None) not in GATES:
+            raise TypeError(f"Элемент {type(el).__name__} не поддерживается компилятором")
+        self.index[id(el)] = len(self.elements)
+        self.elements.append(el)
+
+    def _put(self, code, dst, a, b=None, select=None):
+        self.ops.append(code)
+        self.dst.append(dst)
+        self.src1.append(a)
+        self.src2.append(a if b is None else b)
+        if select is not None:
+            self.select[dst] = select
+        return dst
+
+    def _temp(self):
+        self.size += 1
+        return self.size - 1
+
+    def _chain(self, code, sources, dst):
+        # многовходовый and/or/xor - цепочка двухвходовых
+        acc = sources[0]
+        for source in sources[1:-1]:
+            acc = self._put(code, self._temp(), acc, source)
+        return self._put(code, dst, acc, sources[-1])
+
+    def _emit(self, op, sources, dst):
+        """Команды программы для элемента op со входами sources и выходом dst"""
+        if op in ('not', 'buf'):
+            self._put(OPS[op], dst, sources[0])
+        elif op in ('and', 'or', 'xor'):
+            self._chain(OPS[op], sources, dst)
+        elif op in ('nand', 'nor', 'xnor'):
+            inner = {'nand': AND, 'nor': OR, 'xnor': XOR}[op]
+            self._put(NOT, dst, self._chain(inner, sources, self._temp()))
+        else:
+            # mux: In3 выбирает In2, иначе In1
+            self._put(MUX, dst, *sources)
+
+    def __len__(self):
+        return len(self.elements)
+
+    def evaluate(self, values):
+        """Состояние схемы при значениях входов values (в порядке inputs)"""
+        if len(values) != self.first:
+            raise ValueError(f"Нужно значений входов: {self.first}")
+        state = bytearray(self.size)
+        state[:self.first] = bytes(1 if v else 0 for v in values)
+        for op, dst, a, b in zip(self.ops, self.dst, self.src1, self.src2):
+            if op == AND:
+                state[dst] = state[a] & state[b]
+            elif op == OR:
+                state[dst] = state[a] | state[b]
+            elif op == XOR:
+                state[dst] = state[a] ^ state[b]
+            elif op == BUF:
+                state[dst] = state[a]
+            elif op == MUX:
+                state[dst] = state[b] if state[self.select[dst]] else state[a]
+            else:
+                state[dst] = state[a] ^ 1
+        return state
+
+    def simulate(self, words, mask):
+        """
+        Бит-параллельный проход: words - значения входов (в порядке inputs) целыми числами,
+        бит k - k-й набор входов; mask - маска используемых битов. Возвращает список значений состояния
+        """
+        if len(words) != self.first:
+            raise ValueError(f"Нужно значений входов: {self.first}")
+        state = [w & mask for w in words] + [0] * (self.size - self.first)
+        for op, dst, a, b in zip(self.ops, self.dst, self.src1, self.src2):
+            if op == AND:
+                state[dst] = state[a] & state[b]
+            elif op == OR:
+                state[dst] = state[a] | state[b]
+            elif op == XOR:
+                state[dst] = state[a] ^ state[b]
+            elif op == BUF:
+                state[dst] = state[a]
+            elif op == MUX:
+                # там, где выбор равен 1, биты In1 заменяются битами In2
+                state[dst] = state[a] ^ ((state[a] ^ state[b]) & state[self.select[dst]])
+            else:
+                state[dst] = state[a] ^ mask
+        return state
+
+    def truth_table(self, elements=None, chunk_rows=CHUNK_ROWS):
+        """
+        Таблица истинности по всем наборам входов: для каждого элемента (по умолчанию - outputs)
+        упакованный столбец, бит r - выход в строке r
+        :param chunk_rows: строк за один проход, степень двойки
+        """
+        elements = self.outputs if elements is None else elements
+        slots = [self.first + self.index[id(el)] for el in elements]
+        return chunked_table(self.simulate, self.first, slots, chunk_rows)
+
+    def output(self, state, element):
+        """Выход элемента в состоянии state"""
+        return bool(state[self.first + self.index[id(element)]])
+
+    def run(self, values):
+        """Вычисляет схему и записывает входы и выходы в сами элементы: дальше ими можно пользоваться как обычно"""
+        state = self.evaluate(values)
+        ins = {}
+        for slot, (el, k) in enumerate(self.inputs):
+            ins[id(el), k] = state[slot]
+        for g, el in enumerate(self.elements):
+            for target, k in el.links():
+                ins[id(target), k] = state[self.first + g]
+        for g, el in enumerate(self.elements):
+            el.load([bool(ins.get((id(el), k), 0)) for k in range(1, el.arity + 1)], bool(state[self.first + g]))
+        return state
@@ -0,0 +1,453 @@
+"""
+Небольшой CDCL SAT-решатель и кодирование задачи фрагмента в КНФ.
+
+Решатель: наблюдаемые литералы (по два на клаузу), выучивание клауз по первой точке
+единственности (1UIP), выбор переменной по активности (VSIDS) с сохранением фазы,
+перезапуски по последовательности Люби, решение с предположениями (assumptions).
+Литералы - целые числа: v - переменная истинна, -v - ложна, переменные с 1.
+
+Кодирование: для каждой строки фрагмента - n переменных строки таблицы и копия формулы
+по Цейтину с выходом, равным F строки; для столбцов фрагмента - переменные подстановки
+(каждому столбцу ровно одна переменная функции, каждой переменной не больше одного столбца);
+строки с одинаковым F должны различаться хотя бы в одной переменной.
+Первый в порядке полного перебора ответ находится жадно: биты строк и затем подстановка
+фиксируются по очереди через предположения.
+"""
+import heapq
+
+from formula import postorder
+
+
+def _index(lit):
+    return 2 * lit if lit > 0 else -2 * lit + 1
+
+
+def luby(i):
+    """i-й член последовательности Люби (с единицы): 1, 1, 2, 1, 1, 2, 4, ..."""
+    size, power = 1, 0
+    while size < i + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        power -= 1
+        i = i % size
+    return 1 << power
+
+
+class SATSolver:
+    RESTART_BASE = 100
+    DECAY = 0.95
+
+    def __init__(self):
+        # значение переменной: 0 - не задано, 1 - истина, -1 - ложь
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+        self.watches = [[], []]
+        self.clauses = []
+        self.learnts = []
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.order = []
+        self.bump = 1.0
+        self.ok = True
+        self.model = None
+        self.conflicts = 0
+
+    @property
+    def num_vars(self):
+        return len(self.values) - 1
+
+    def new_var(self):
+        self.values.append(0)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phase.append(False)
+        self.watches += [[], []]
+        v = len(self.values) - 1
+        heapq.heappush(self.order, (0.0, v))
+        return v
+
+    def value(self, lit):
+        value = self.values[abs(lit)]
+        return value if lit > 0 else -value
+
+    def add_clause(self, lits):
+        """Добавляет клаузу (только между вызовами solve); False - формула стала противоречивой"""
+        if not self.ok:
+            return False
+        clause = []
+        for lit in lits:
+            if -lit in clause:
+                return True
+            value = self.value(lit)
+            if value == 1:
+                return True
+            if value == 0 and lit not in clause:
+                clause.append(lit)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self._enqueue(clause[0], None)
+            self.ok = self._propagate() is None
+        else:
+            self._attach(clause)
+            self.clauses.append(clause)
+        return self.ok
+
+    def _attach(self, clause):
+        self.watches[_index(clause[0])].append(clause)
+        self.watches[_index(clause[1])].append(clause)
+
+    def _enqueue(self, lit, reason):
+        v = abs(lit)
+        self.values[v] = 1 if lit > 0 else -1
+        self.levels[v] = len(self.trail_lim)
+        self.reasons[v] = reason
+        self.trail.append(lit)
+
+    def _propagate(self):
+        """Распространение единичных клауз; возвращает конфликтную клаузу или None"""
+        values = self.values
+        while self.qhead < len(self.trail):
+            false_lit = -self.trail[self.qhead]
+            self.qhead += 1
+            watchers = self.watches[_index(false_lit)]
+            i = j = 0
+            while i < len(watchers):
+                clause = watchers[i]
+                i += 1
+                # наблюдаемый ложный литерал держим вторым
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                first_value = values[first] if first > 0 else -values[-first]
+                if first_value == 1:
+                    watchers[j] = clause
+                    j += 1
+                    continue
+                for k in range(2, len(clause)):
+                    lit = clause[k]
+                    if (values[lit] if lit > 0 else -values[-lit]) != -1:
+                        clause[1], clause[k] = lit, false_lit
+                        self.watches[_index(lit)].append(clause)
+                        break
+                else:
+                    watchers[j] = clause
+                    j += 1
+                    if first_value == -1:
+                        # конфликт: непросмотренные клаузы остаются в списке
+                        del watchers[j:i]
+                        return clause
+                    self._enqueue(first, clause)
+            del watchers[j:]
+        return None
+
+    def _analyze(self, conflict):
+        """Выученная клауза по первой точке единственности и уровень возврата"""
+        level = len(self.trail_lim)
+        learnt = [0]
+        seen = set()
+        counter = 0
+        p = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for lit in (clause if p is None else clause[1:]):
+                v = abs(lit)
+                if v not in seen and self.levels[v] > 0:
+                    seen.add(v)
+                    self._bump(v)
+                    if self.levels[v] == level:
+                        counter += 1
+                    else:
+                        learnt.append(lit)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            p = self.trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.reasons[abs(p)]
+        learnt[0] = -p
+        if len(learnt) == 1:
+            return learnt, 0
+        # второй наблюдаемый литерал - с самого высокого уровня после текущего
+        best = max(range(1, len(learnt)), key=lambda k: self.levels[abs(learnt[k])])
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, self.levels[abs(learnt[1])]
+
+    def _bump(self, v):
+        self.activity[v] += self.bump
+        if self.activity[v] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.bump *= 1e-100
+            self.order = [(-self.activity[u], u) for u in range(1, len(self.values)) if not self.values[u]]
+            heapq.heapify(self.order)
+        elif not self.values[v]:
+            heapq.heappush(self.order, (-self.activity[v], v))
+
+    def _cancel_until(self, level):
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for lit in self.trail[start:]:
+            v = abs(lit)
+            self.phase[v] = lit > 0
+            self.values[v] = 0
+            self.reasons[v] = None
+            heapq.heappush(self.order, (-self.activity[v], v))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def _pick(self):
+        while self.order:
+            activity, v = heapq.heappop(self.order)
+            if not self.values[v] and -activity == self.activity[v]:
+                return v
+        for v in range(1, len(self.values)):
+            if not self.values[v]:
+                return v
+        return None
+
+    def _reduce(self):
+        """Удаляет длинную половину выученных клауз; вызывается на нулевом уровне"""
+        self.learnts.sort(key=len)
+        keep = len(self.learnts) // 2
+        removed = {id(clause) for clause in self.learnts[keep:] if len(clause) > 2}
+        if not removed:
+            return
+        self.learnts = [clause for clause in self.learnts if id(clause) not in removed]
+        for k, watchers in enumerate(self.watches):
+            self.watches[k] = [clause for clause in watchers if id(clause) not in removed]
+
+    def solve(self, assumptions=(), tick=None):
+        """
+        Выполнима ли формула при истинных литералах assumptions.
+        При выполнимости self.model - список значений переменных (model[v] - bool, model[0] не используется).
+        :param tick: вызывается на каждом конфликте (счётчик, проверка отмены)
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        if self._propagate() is not None:
+            self.ok = False
+            return False
+        restarts = 0
+        budget = self.RESTART_BASE * luby(restarts)
+        max_learnts = max(1000, len(self.clauses) // 3)
+        try:
+            while True:
+                conflict = self._propagate()
+                if conflict is not None:
+                    self.conflicts += 1
+                    if tick is not None:
+                        tick()
+                    if not self.trail_lim:
+                        self.ok = False
+                        return False
+                    learnt, back = self._analyze(conflict)
+                    self._cancel_until(back)
+                    if len(learnt) == 1:
+                        self._enqueue(learnt[0], None)
+                    else:
+                        self._attach(learnt)
+                        self.learnts.append(learnt)
+                        self._enqueue(learnt[0], learnt)
+                    self.bump /= self.DECAY
+                    budget -= 1
+                    if budget <= 0:
+                        restarts += 1
+                        budget = self.RESTART_BASE * luby(restarts)
+                        self._cancel_until(0)
+                        if len(self.learnts) > max_learnts:
+                            self._reduce()
+                            max_learnts += max_learnts // 10
+                    continue
+                level = len(self.trail_lim)
+                if level < len(assumptions):
+                    lit = assumptions[level]
+                    value = self.value(lit)
+                    if value == -1:
+                        return False
+                    self.trail_lim.append(len(self.trail))
+                    if value == 0:
+                        self._enqueue(lit, None)
+                    continue
+                v = self._pick()
+                if v is None:
+                    self.model = [value > 0 for value in self.values]
+                    return True
+                self.trail_lim.append(len(self.trail))
+                self._enqueue(v if self.phase[v] else -v, None)
+        finally:
+            self._cancel_until(0)
+
+
+def tseitin(solver, tree, inputs, memo=None):
+    """
+    Литерал, равный формуле, с клаузами Цейтина в solver.
+    :param inputs: {имя переменной: литерал}
+    :param memo: {id узла: литерал} - уже закодированные узлы того же дерева
+    """
+    if memo is None:
+        memo = {}
+    for node in postorder(tree):
+        if id(node) in memo:
+            continue
+        op = node[0]
+        if op == 'var':
+            lit = inputs[node[1]]
+        elif op == 'const':
+            lit = solver.new_var()
+            solver.add_clause([lit if node[1] else -lit])
+        elif op == 'not':
+            lit = -memo[id(node[1])]
+        else:
+            a, b = memo[id(node[1])], memo[id(node[2])]
+            if op == 'imp':
+                op, a = 'or', -a
+            if op == 'eq':
+                op, b = 'xor', -b
+            lit = solver.new_var()
+            if op == 'and':
+                clauses = [[-lit, a], [-lit, b], [lit, -a, -b]]
+            elif op == 'or':
+                clauses = [[lit, -a], [lit, -b], [-lit, a, b]]
+            else:
+                clauses = [[-lit, a, b], [-lit, -a, -b], [lit, -a, b], [lit, a, -b]]
+            for clause in clauses:
+                solver.add_clause(clause)
+        memo[id(node)] = lit
+    return memo[id(tree)]
+
+
+def at_least(solver, lits, count):
+    """Клаузы "истинны хотя бы count литералов из lits" (последовательный счётчик)"""
+    if count <= 0:
+        return
+    if count == 1 or count > len(lits):
+        solver.add_clause(lits if count == 1 else [])
+        return
+    # prev[j] - среди литералов до текущего истинны хотя бы j + 1
+    prev = []
+    for lit in lits:
+        cur = [solver.new_var() for _ in range(min(count, len(prev) + 1))]
+        for j, s in enumerate(cur):
+            # s - из prev[j] или из текущего литерала вместе с prev[j - 1]
+            rest = [prev[j]] if j < len(prev) else []
+            solver.add_clause([-s] + rest + [lit])
+            if j:
+                solver.add_clause([-s] + rest + [prev[j - 1]])
+        prev = cur
+    solver.add_clause([prev[count - 1]])
+
+
+class FragmentEncoder:
+    """Задача фрагмента в КНФ и поиск первого ответа в порядке полного перебора"""
+
+    def __init__(self, tree, variables, part_table, tick=None):
+        self.tree = tree
+        self.variables = tuple(variables)
+        self.part_table = part_table
+        self.tick = tick
+        self.solver = SATSolver()
+        self.rows = []
+        self.columns = []
+
+    def encode(self):
+        """Строит КНФ; False - фрагмент заведомо не подходит"""
+        n = len(self.variables)
+        if not self.part_table:
+            return False
+        k = len(self.part_table[0]) - 1
+        if k > n or any(row[-1] not in (0, 1) for row in self.part_table):
+            return False
+        solver = self.solver
+        for row in self.part_table:
+            bits = [solver.new_var() for _ in range(n)]
+            self.rows.append(bits)
+            out = tseitin(solver, self.tree, dict(zip(self.variables, bits)))
+            solver.add_clause([out if row[-1] else -out])
+            # единиц и нулей в строке не меньше, чем известных в строке фрагмента, при любой подстановке
+            at_least(solver, bits, row[:-1].count(1))
+            at_least(solver, [-bit for bit in bits], row[:-1].count(0))
+        # columns[j][v] - столбец фрагмента j является переменной v
+        for j in range(k):
+            choice = [solver.new_var() for _ in range(n)]
+            self.columns.append(choice)
+            solver.add_clause(choice)
+            for a in range(n):
+                for b in range(a + 1, n):
+                    solver.add_clause([-choice[a], -choice[b]])
+        for v in range(n):
+            for a in range(k):
+                for b in range(a + 1, k):
+                    solver.add_clause([-self.columns[a][v], -self.columns[b][v]])
+        # известная клетка: если столбец j - переменная v, то бит v строки равен клетке
+        for i, row in enumerate(self.part_table):
+            for j in range(k):
+                if row[j] is not None:
+                    for v in range(n):
+                        bit = self.rows[i][v]
+                        solver.add_clause([-self.columns[j][v], bit if row[j] else -bit])
+        # строки с одним значением F должны различаться хотя бы в одной переменной
+        for a in range(len(self.part_table)):
+            for b in range(a + 1, len(self.part_table)):
+                if self.part_table[a][-1] != self.part_table[b][-1]:
+                    continue
+                differ = []
+                for v in range(n):
+                    d = solver.new_var()
+                    x, y = self.rows[a][v], self.rows[b][v]
+                    solver.add_clause([-d, x, y])
+                    solver.add_clause([-d, -x, -y])
+                    differ.append(d)
+                solver.add_clause(differ)
+        return solver.ok
+
+    def _try(self, assumptions):
+        """Проверка с предположениями; при неудаче остаётся прежняя модель"""
+        model = self.solver.model
+        if self.solver.solve(assumptions, self.tick):
+            return True
+        self.solver.model = model
+        return False
+
+    def solve(self):
+        """Первый ответ (index, filled_rows) в порядке полного перебора или -1"""
+        if not self.encode() or not self._try([]):
+            return -1
+        solver = self.solver
+        assumptions = []
+        # биты строк по очереди, от старшего: ноль, если с ним ещё есть решение
+        for bits in self.rows:
+            for bit in bits:
+                if not solver.model[bit] or self._try(assumptions + [-bit]):
+                    assumptions.append(-bit)
+                else:
+                    assumptions.append(bit)
+        model = solver.model
+        rows = [sum(model[bit] << (len(bits) - 1 - v) for v, bit in enumerate(bits)) for bits in self.rows]
+        # подстановка при найденных строках: каждому столбцу - наименьшая возможная переменная
+        index = []
+        for choice in self.columns:
+            current = next(v for v, lit in enumerate(choice) if model[lit])
+            for v in range(current):
+                if self._try(assumptions + [choice[v]]):
+                    model = solver.model
+                    current = v
+                    break
+            assumptions.append(choice[current])
+            index.append(current)
+        n = len(self.variables)
+        shifts = [n - 1 - v for v in index]
+        return tuple(index), [[(r >> s) & 1 for s in shifts] + [row[-1]]
+                              for r, row in zip(rows, self.part_table)]
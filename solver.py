@@ -0,0 +1,465 @@
+"""
+Логика Solver без интерфейса: разбор функции, таблица истинности, кэш и поиск ответа.
+
+Модуль не импортирует tkinter и подходит для серверов и пакетной обработки
+(bulk_solver.py, solver_daemon.py, solver_bench.py); окно - в 2_solver.py.
+"""
+from collections import OrderedDict
+import copy
+import threading
+import warnings
+
+import answer_index
+import bdd
+import minimize
+import sat
+import table_export
+from formula import parse, variables_of, compile_formula, iter_ones, row_values, variable_masks, weight_masks
+from fragment_search import FragmentSearch
+
+VARIABLES = ('x', 'y', 'z', 'w')
+
+
+def find_variables(func):
+    """Переменные функции: сначала x, y, z, w в привычном порядке, остальные по алфавиту"""
+    names = variables_of(parse(func) if isinstance(func, str) else func)
+    return tuple(sorted(names, key=lambda name: (VARIABLES.index(name) if name in VARIABLES else len(VARIABLES),
+                                                 name)))
+
+
+def first_distinct_rows(candidates, used=0):
+    """
+    Лексикографически первый набор попарно различных строк таблицы.
+    :param candidates: для каждой строки фрагмента маска подходящих строк таблицы
+    :return: кортеж номеров строк или None
+    """
+    if not candidates:
+        return ()
+    free = candidates[0] & ~used
+    while free:
+        low = free & -free
+        rest = first_distinct_rows(candidates[1:], used | low)
+        if rest is not None:
+            return (low.bit_length() - 1,) + rest
+        free ^= low
+    return None
+
+
+class CacheEntry:
+    """Всё, что посчитано для одной булевой функции: таблица, индекс строк и ответы по фрагментам"""
+
+    def __init__(self, packed):
+        self.packed = packed
+        self.table = []
+        self.row_index = {}
+        # сигнатуры столбцов таблицы для отбора переменных (Solver.column_signatures)
+        self.signatures = None
+        self.results = OrderedDict()
+
+
+class SolverCache:
+    """
+    LRU-кэш для Solver. Ключ - отпечаток таблицы истинности (переменные и столбец F),
+    поэтому разные записи одной функции ("x ∧ y", "y and x") попадают в одну запись.
+    """
+
+    def __init__(self, maxsize=256, max_results=1024):
+        self.maxsize = maxsize
+        self.max_results = max_results
+        self.spellings = OrderedDict()
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+        self.result_hits = self.result_misses = 0
+        # решатели могут работать в фоновых потоках
+        self.lock = threading.RLock()
+
+    def _put(self, store, key, value, limit):
+        store[key] = value
+        if len(store) > limit:
+            store.popitem(last=False)
+
+    def entry(self, tree, variables, build):
+        """
+        Запись кэша для функции.
+        :param tree: разобранная формула - не зависит от пробелов, скобок и записи операций
+        :param build: считает упакованный столбец F, если такая запись функции ещё не встречалась
+        """
+        spelling = (variables, tree)
+        with self.lock:
+            fingerprint = self.spellings.get(spelling)
+            if fingerprint is None:
+                fingerprint = (variables, build())
+                self._put(self.spellings, spelling, fingerprint, self.maxsize)
+            else:
+                self.spellings.move_to_end(spelling)
+            entry = self.entries.get(fingerprint)
+            if entry is None:
+                self.misses += 1
+                entry = CacheEntry(fingerprint[1])
+                self._put(self.entries, fingerprint, entry, self.maxsize)
+            else:
+                self.hits += 1
+                self.entries.move_to_end(fingerprint)
+            return entry
+
+    def get_result(self, entry, key):
+        with self.lock:
+            result = entry.results.get(key)
+            if result is None:
+                self.result_misses += 1
+            else:
+                self.result_hits += 1
+                entry.results.move_to_end(key)
+            return result
+
+    def put_result(self, entry, key, result):
+        with self.lock:
+            self._put(entry.results, key, result, self.max_results)
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'result_hits': self.result_hits, 'result_misses': self.result_misses,
+                'maxsize': self.maxsize, 'currsize': len(self.entries)}
+
+    def clear(self):
+        with self.lock:
+            self.spellings.clear()
+            self.entries.clear()
+            self.hits = self.misses = 0
+            self.result_hits = self.result_misses = 0
+
+
+class SolverCancelled(Exception):
+    """Поиск остановлен: нажата отмена или вышло время"""
+
+
+def load_answer_index(path=answer_index.DEFAULT_PATH):
+    """Индекс ответов для четырёх переменных, если он построен (python answer_index.py build)"""
+    try:
+        return answer_index.load(path)
+    except (OSError, answer_index.AnswerIndexError) as e:
+        warnings.warn(f"Индекс ответов не загружен: {e}")
+        return None
+
+
+# Логика солвера
+class Solver(FragmentSearch):
+    # общий кэш всех решателей; None - без кэша
+    cache = SolverCache()
+    # индекс ответов для функций четырёх переменных, открывается один раз при запуске
+    answers = load_answer_index()
+
+    BACKENDS = ('auto', 'table', 'bdd', 'sat')
+    # backend="auto": таблица до TABLE_MAX_VARS переменных, диаграмма до BDD_MAX_VARS, дальше - SAT
+    TABLE_MAX_VARS = 20
+    BDD_MAX_VARS = 28
+
+    def __init__(self, func, part_table, variables=None, backend='auto'):
+        '''
+        :param func - str with variables x, y, z, w and logic elements "¬", "∧", "∨", "→", "≡", "()"
+        or their Python spelling "not", "and", "or", "<=", "==" (see formula.py), it is parsed, never evaluated:
+        example: "(x <= y) and (y or z) or (not w == x)"
+        :param part_table: matrix 3 by 4. with lists of ints and Nones, like this:
+        [
+        [0, 1, None, None, 0],
+        [None, 0, 0, 0, 0],
+        [0, None, 1, None, 0]
+        ]
+        :param variables: None - x, y, z, w; "auto" - переменные ищутся в функции;
+        либо явный список имён. Фрагмент может иметь любое число строк и до len(variables) + 1 столбцов.
+        :param backend: "table" - упакованная таблица истинности; "bdd" - диаграмма решений (bdd.py)
+        для функций, чья таблица не помещается в память (от 25 переменных); "sat" - КНФ и CDCL (sat.py)
+        для 30 и больше переменных; "auto" - выбор по числу переменных. Ответы у всех одинаковые.
+        '''
+        # should_stop() проверяется во время поиска; True - поиск прерывается SolverCancelled
+        self.should_stop = None
+        self.new_value(func, part_table, variables, backend)
+
+    def create_packed_table(self):
+        """Столбец F всей таблицы одним числом: бит r равен значению F в строке r"""
+        if self.packed is None:
+            n = len(self.variables)
+
+            def build():
+                return compile_formula(self.tree, self.variables)(variable_masks(n), (1 << (1 << n)) - 1)
+
+            if self.cache is None:
+                self.packed = build()
+            else:
+                self.entry = self.cache.entry(self.tree, self.variables, build)
+                self.packed = self.entry.packed
+                self.table = self.entry.table
+                self.row_index = self.entry.row_index
+                if self.signatures is None:
+                    self.signatures = self.entry.signatures
+        return self.packed
+
+    def with_fragment(self, part_table):
+        """
+        Решатель той же функции для другого фрагмента: таблица, индекс строк и сигнатуры столбцов
+        общие с этим решателем и не пересчитываются. Сам решатель не меняется - его поиск может ещё идти.
+        """
+        other = copy.copy(self)
+        other.part_table = [i for i in part_table]
+        other.should_stop = None
+        other.progress = 0
+        return other
+
+    def column_signatures(self):
+        """
+        Сигнатура столбца таблицы: сколько нулей и единиц у переменной при F = 0 и F = 1.
+        Зависит только от функции, поэтому считается один раз и хранится в записи кэша.
+        """
+        if self.signatures is None:
+            n = len(self.variables)
+            columns = self.column_masks()
+            f_rows = (self.rows_matching(0, 0, 0), self.rows_matching(1, 0, 0))
+            self.signatures = [[(f_rows[f] & columns[v][b]).bit_count() for f in (0, 1) for b in (0, 1)]
+                               for v in range(n)]
+            if self.entry is not None:
+                self.entry.signatures = self.signatures
+        return self.signatures
+
+    def create_bdd(self):
+        """Диаграмма решений функции: (менеджер, корень)"""
+        if self.diagram is None:
+            manager = bdd.BDD(self.variables)
+            self.diagram = manager, manager.from_tree(self.tree)
+        return self.diagram
+
+    def rows_for(self, index, filled_rows):
+        """Маска строк таблицы, совпадающих с заполненными строками фрагмента при подстановке index"""
+        mask = 0
+        for row in filled_rows:
+            care = bits = 0
+            for v, value in zip(index, row):
+                care |= 1 << v
+                bits |= value << v
+            mask |= self.rows_matching(row[-1], care, bits)
+        return mask
+
+    def create_whole_table(self):
+        """Таблица истинности списком строк; у каждого вызова своя копия, её можно менять"""
+        packed = self.create_packed_table()
+        if not self.table:
+            n = len(self.variables)
+            shifts = range(n - 1, -1, -1)
+            # список заполняется на месте, чтобы таблица осталась общей с записью кэша;
+            # строки - кортежи, общую таблицу снаружи не испортить
+            self.table.extend(tuple([(r >> s) & 1 for s in shifts] + [(packed >> r) & 1]) for r in range(1 << n))
+        return [list(row) for row in self.table]
+
+    def export_table(self, path, binary=True, chunk_rows=table_export.CHUNK_ROWS):
+        """
+        Выгружает таблицу в файл блоками, не строя create_whole_table: память не растёт с числом переменных.
+        binary=True - упакованный формат (читается table_export.TableFile через mmap), иначе CSV.
+        """
+        table_export.export(self.tree, self.variables, path, binary, chunk_rows)
+
+    def minimal_formula(self, form='sop'):
+        """Минимальная ДНФ ("sop") или КНФ ("pos") функции строкой, которую снова понимает Solver (minimize.py)"""
+        return minimize.minimize_packed(self.create_packed_table(), self.variables, form)
+
+    def rows_matching(self, f, care, bits):
+        """
+        Индекс строк таблицы по ключу (значение F, известные биты).
+        :param care: маска известных переменных (бит v - переменная с номером v)
+        :param bits: значения известных переменных в тех же битах
+        :return: маска строк таблицы с F == f и совпадающими известными битами
+        """
+        key = (f, care, bits)
+        mask = self.row_index.get(key)
+        if mask is None:
+            if not care:
+                packed = self.create_packed_table()
+                mask = packed if f else ((1 << (1 << len(self.variables))) - 1) ^ packed
+            else:
+                low = care & -care
+                column = self.column_masks()[low.bit_length() - 1]
+                mask = self.rows_matching(f, care ^ low, bits & ~low) & column[1 if bits & low else 0]
+            self.row_index[key] = mask
+        return mask
+
+    def column_masks(self):
+        """Для каждой переменной пара масок строк, где она равна 0 и 1"""
+        if self.columns is None:
+            full = (1 << (1 << len(self.variables))) - 1
+            self.columns = [(full ^ mask, mask) for mask in variable_masks(len(self.variables))]
+        return self.columns
+
+    def solve(self):
+        if self.backend != 'table':
+            return self.search()
+        self.create_packed_table()
+        if self.entry is None:
+            return self.search()
+        key = tuple(tuple(row) for row in self.part_table)
+        result = self.cache.get_result(self.entry, key)
+        if result is None:
+            result = self.search()
+            self.cache.put_result(self.entry, key, result)
+        if result == -1:
+            return -1
+        index, rows = result
+        return index, [row[:] for row in rows]
+
+    def search(self):
+        """Поиск первого ответа без кэша: тот же, что дал бы полный перебор строк и подстановок"""
+        if self.backend == 'bdd':
+            return self._search_bdd()
+        if self.backend == 'sat':
+            return sat.FragmentEncoder(self.tree, self.variables, self.part_table, self._tick).solve()
+        if self.answers is not None and len(self.variables) == answer_index.N:
+            result = self._search_indexed()
+            if result is not None:
+                return result
+        return next(self.iter_solutions(), -1)
+
+    def _search_indexed(self):
+        """
+        Ответ через индекс ответов: подстановки столбцов берутся из индекса по столбцу F,
+        для каждой - первые различные строки из индекса строк таблицы.
+        :return: ответ, -1 или None, если фрагмент не подходит для индекса
+        """
+        if not self.part_table or any(len(row) != answer_index.N + 1 or row[-1] not in (0, 1)
+                                      for row in self.part_table):
+            return None
+        best = None
+        for index in self.answers.permutations_for(self.create_packed_table(), self.part_table):
+            candidates = []
+            for row in self.part_table:
+                care = bits = 0
+                for v, value in zip(index, row):
+                    if value is not None:
+                        care |= 1 << v
+                        bits |= value << v
+                candidates.append(self.rows_matching(row[-1], care, bits))
+            rows = first_distinct_rows(candidates)
+            if rows is not None and (best is None or rows < best[0]):
+                best = rows, index
+        if best is None:
+            return -1
+        rows, index = best
+        return index, self._fill(index, rows)
+
+    def _search_bdd(self):
+        """Тот же поиск на диаграмме решений: строки не перечисляются, множества строк - диаграммы"""
+        manager, root = self.create_bdd()
+        return bdd.FragmentMatcher(manager, root, self.part_table, self._tick).solve()
+
+    def _tick(self):
+        self.progress += 1
+        if self.should_stop is not None and self.should_stop():
+            raise SolverCancelled
+
+    def _fill(self, index, rows):
+        """Заполненные строки фрагмента по номерам строк таблицы"""
+        packed = self.create_packed_table()
+        n = len(self.variables)
+        filled = []
+        for r in rows:
+            values = row_values(r, n)
+            filled.append([values[v] for v in index] + [(packed >> r) & 1])
+        return filled
+
+    def iter_solutions(self):
+        """
+        Лениво выдаёт все решения (index, filled_rows) в порядке полного перебора:
+        сначала по номерам строк таблицы, для одних и тех же строк - по подстановке столбцов
+        """
+        for rows, known in self._row_tuples():
+            for index in self._indexes(self._compatible(rows, known), []):
+                yield index, self._fill(index, rows)
+
+    def count_solutions(self):
+        """Число решений без построения заполненных строк"""
+        n = len(self.variables)
+        total = 0
+        for rows, known in self._row_tuples():
+            compatible = self._compatible(rows, known)
+            filled = [j for j in range(len(compatible)) if known[j]]
+            # пустые столбцы фрагмента получают любые из оставшихся переменных
+            blanks = 1
+            for free in range(n - len(filled), n - len(compatible), -1):
+                blanks *= free
+            total += self._count_indexes([compatible[j] for j in filled], 0, {}) * blanks
+        return total
+
+    def _weight_rows(self, low, high):
+        """Маска строк таблицы, в номере которых от low до high единиц"""
+        mask = self.weights.get((low, high))
+        if mask is None:
+            mask = 0
+            for w in range(low, high + 1):
+                mask |= weight_masks(len(self.variables))[w]
+            self.weights[low, high] = mask
+        return mask
+
+    def _candidate_rows(self, f, fixed, reach, chosen, weight):
+        """
+        Маска строк таблицы со значением f, битами fixed и весом из маски weight,
+        где каждое значение из reach есть у одной из переменных
+        """
+        care = bits = 0
+        for v, value in fixed.items():
+            care |= 1 << v
+            bits |= value << v
+        used = 0
+        for r in chosen:
+            used |= 1 << r
+        mask = self.rows_matching(f, care, bits) & weight & ~used
+        columns = self.column_masks()
+        for domain, value in reach:
+            union = 0
+            for v in domain:
+                union |= columns[v][value]
+            mask &= union
+        return mask
+
+    def _has_value(self, mask, v, value):
+        return mask & self.column_masks()[v][value]
+
+    def _distinct_rows(self, candidates, chosen):
+        used = 0
+        for r in chosen:
+            used |= 1 << r
+        return first_distinct_rows(candidates, used) is not None
+
+    _iter_rows = staticmethod(iter_ones)
+
+    def _count_indexes(self, compatible, used, memo):
+        """Число способов раздать столбцам разные переменные; used - маска уже занятых"""
+        j = used.bit_count()
+        if j == len(compatible):
+            return 1
+        if used not in memo:
+            memo[used] = sum(self._count_indexes(compatible, used | (1 << v), memo)
+                             for v in compatible[j] if not used & (1 << v))
+        return memo[used]
+
+    def new_value(self, func, part_table, variables=None, backend='auto'):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Неизвестный способ решения: {backend!r}")
+        self.func = func
+        self.tree = parse(func)
+        if variables is None:
+            variables = VARIABLES
+        elif variables == 'auto':
+            variables = find_variables(self.tree)
+        self.variables = tuple(variables)
+        if backend == 'auto':
+            n = len(self.variables)
+            backend = 'table' if n <= self.TABLE_MAX_VARS else 'bdd' if n <= self.BDD_MAX_VARS else 'sat'
+        self.backend = backend
+        self.part_table = [i for i in part_table]
+        self.table = []
+        self.table_needed = []
+        self.packed = None
+        self.columns = None
+        self.row_index = {}
+        self.weights = {}
+        self.entry = None
+        self.signatures = None
+        self.diagram = None
+        # число просмотренных узлов поиска
+        self.progress = 0
@@ -0,0 +1,220 @@
+"""
+Замер скорости Solver и сверка ответов с исходной реализацией на eval.
+
+Задачи генерируются детерминированно по seed: формулы на 4-8 переменных, фрагменты
+с разным числом пустых клеток, решаемые (строки взяты из таблицы) и случайные (обычно без решения),
+часть формул повторяется в другой записи (Python / ¬ ∧ ∨ → ≡) - так виден эффект кэша.
+
+На каждую задачу пишется строка JSONL со временем фаз (parse, table, search) в секундах,
+числом узлов поиска и результатом сверки. В конце - сводка по числу переменных в stderr.
+
+Пример: python solver_bench.py --tasks 200 -o bench.jsonl
+        python solver_bench.py --tasks 200 --backend bdd
+        python solver_bench.py --tasks 200 --baseline bench.jsonl
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from itertools import permutations
+
+from formula import row_values
+from solver import Solver
+
+NAMES = ('x', 'y', 'z', 'w', 'a', 'b', 'c', 'd')
+PHASES = ('parse', 'table', 'search')
+
+
+def random_formula(rng, variables, depth):
+    """Формула с полной расстановкой скобок в двух записях: (для eval, в символах)"""
+    if depth == 0 or rng.random() < 0.15:
+        name = rng.choice(variables)
+        return name, name
+    op = rng.choice(('and', 'or', 'not', 'eq', 'imp', 'xor'))
+    if op == 'not':
+        py, uni = random_formula(rng, variables, depth - 1)
+        return f"(not {py})", f"¬({uni})"
+    (py_a, uni_a), (py_b, uni_b) = random_formula(rng, variables, depth - 1), random_formula(rng, variables, depth - 1)
+    if op == 'xor':
+        return f"({py_a} != {py_b})", f"¬({uni_a} ≡ {uni_b})"
+    py_op, uni_op = {'and': ('and', '∧'), 'or': ('or', '∨'), 'eq': ('==', '≡'), 'imp': ('<=', '→')}[op]
+    return f"({py_a} {py_op} {py_b})", f"({uni_a} {uni_op} {uni_b})"
+
+
+def reference_table(func, variables):
+    """Таблица истинности, как её строила исходная версия: eval на каждую строку"""
+    n = len(variables)
+    table = []
+    for r in range(1 << n):
+        env = dict(zip(variables, row_values(r, n)))
+        table.append([env[name] for name in variables] + [int(eval(func, {}, env))])
+    return table
+
+
+def reference_solve(table, part_table, n):
+    """Исходный перебор строк и подстановок, обобщённый на n переменных"""
+    k = len(part_table[0]) - 1
+    for tble in permutations(table, r=len(part_table)):
+        for index in permutations(range(n), k):
+            for i in range(len(part_table)):
+                if tble[i][-1] != part_table[i][-1]:
+                    break
+                if any(part_table[i][j] is not None and tble[i][index[j]] != part_table[i][j] for j in range(k)):
+                    break
+            else:
+                return index, [[row[i] for i in index] + [row[-1]] for row in tble]
+    return -1
+
+
+def is_valid(table, part_table, result):
+    """Ответ согласуется с фрагментом и со строками таблицы, строки различны"""
+    index, rows = result
+    seen = set()
+    for part, filled in zip(part_table, rows):
+        if any(p is not None and p != f for p, f in zip(part, filled)):
+            return False
+        matches = [r for r, row in enumerate(table) if [row[i] for i in index] + [row[-1]] == filled]
+        if not matches or matches[0] in seen:
+            return False
+        seen.add(matches[0])
+    return True
+
+
+def make_tasks(seed, count, min_vars, max_vars, repeat_share):
+    """Генератор задач: словари с формулами, фрагментом и описанием"""
+    rng = random.Random(seed)
+    formulas = []
+    for number in range(count):
+        n = rng.randint(min_vars, max_vars)
+        variables = NAMES[:n]
+        repeat = bool(formulas) and rng.random() < repeat_share
+        if repeat:
+            py, uni, variables = rng.choice(formulas)
+            n = len(variables)
+        else:
+            py, uni = random_formula(rng, variables, rng.randint(3, 5))
+            formulas.append((py, uni, variables))
+        table = reference_table(py, variables)
+        rows = rng.choice((3, 3, 4))
+        blanks = rng.randint(0, rows * n - 1)
+        if rng.random() < 0.7:
+            kind = 'solvable'
+            chosen = rng.sample(table, rows)
+            perm = rng.sample(range(n), n)
+            part = [[row[v] for v in perm] + [row[-1]] for row in chosen]
+        else:
+            kind = 'random'
+            part = [[rng.randint(0, 1) for _ in range(n + 1)] for _ in range(rows)]
+        cells = [(i, j) for i in range(rows) for j in range(n)]
+        for i, j in rng.sample(cells, blanks):
+            part[i][j] = None
+        yield {'task': number, 'vars': n, 'rows': rows, 'blanks': blanks, 'kind': kind, 'repeat': repeat,
+               'variables': variables, 'python': py, 'func': uni if repeat and rng.random() < 0.5 else py,
+               'part_table': part, 'table': table}
+
+
+def run_task(task, exact_max_vars, backend='auto'):
+    record = {key: task[key] for key in ('task', 'vars', 'rows', 'blanks', 'kind', 'repeat')}
+    start = time.perf_counter()
+    solver = Solver(task['func'], task['part_table'], task['variables'], backend)
+    parsed = time.perf_counter()
+    if solver.backend == 'bdd':
+        # фаза table - построение диаграммы; столбец F для сверки берётся из её строк
+        manager, root = solver.create_bdd()
+        packed = sum(1 << r for r in manager.iter_rows(root))
+    elif solver.backend == 'sat':
+        # КНФ строится внутри поиска; столбец F для сверки - по таблице
+        packed = Solver(task['python'], [], task['variables'], 'table').create_packed_table()
+    else:
+        packed = solver.create_packed_table()
+    tabled = time.perf_counter()
+    result = solver.solve()
+    searched = time.perf_counter()
+    record.update(parse=parsed - start, table=tabled - parsed, search=searched - tabled,
+                  nodes=solver.progress, solved=result != -1)
+
+    # сверка: столбец F с eval-таблицей, ответ - с исходным перебором (если он посилен) или на согласованность
+    table = task['table']
+    ok = all((packed >> r) & 1 == row[-1] for r, row in enumerate(table))
+    if task['vars'] <= exact_max_vars:
+        record['check'] = 'exact'
+        ok = ok and result == reference_solve(table, task['part_table'], task['vars'])
+    else:
+        record['check'] = 'valid'
+        ok = ok and (result == -1 or is_valid(table, task['part_table'], result))
+    record['ok'] = ok
+    return record
+
+
+def summarize(records, log):
+    groups = {}
+    for record in records:
+        groups.setdefault(record['vars'], []).append(record)
+    print("vars  tasks  solved   parse,ms   table,ms  search,ms  max search,ms  nodes  failed", file=log)
+    for n in sorted(groups):
+        group = groups[n]
+        medians = [statistics.median(r[phase] for r in group) * 1000 for phase in PHASES]
+        print(f"{n:4d} {len(group):6d} {sum(r['solved'] for r in group):7d} "
+              f"{medians[0]:10.3f} {medians[1]:10.3f} {medians[2]:10.3f} "
+              f"{max(r['search'] for r in group) * 1000:14.3f} "
+              f"{statistics.median(r['nodes'] for r in group):6.0f} {sum(not r['ok'] for r in group):7d}", file=log)
+
+
+def compare(baseline, records, log):
+    """Отношение медиан по фазам: базовый прогон / текущий (больше 1 - стало быстрее)"""
+    old = {r['task']: r for r in baseline}
+    pairs = [(old[r['task']], r) for r in records if r['task'] in old]
+    if not pairs:
+        print("Нет общих задач с базовым прогоном", file=log)
+        return
+    for phase in PHASES:
+        before = statistics.median(a[phase] for a, b in pairs)
+        after = statistics.median(b[phase] for a, b in pairs)
+        ratio = before / after if after else float('inf')
+        print(f"{phase:>6}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms (x{ratio:.2f})", file=log)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер скорости Solver и сверка с исходной реализацией")
+    parser.add_argument('--tasks', type=int, default=200, help="число задач")
+    parser.add_argument('--seed', type=int, default=1, help="зерно генератора задач")
+    parser.add_argument('--min-vars', type=int, default=4)
+    parser.add_argument('--max-vars', type=int, default=8)
+    parser.add_argument('--repeat-share', type=float, default=0.3, help="доля задач с уже встречавшейся формулой")
+    parser.add_argument('--exact-max-vars', type=int, default=4,
+                        help="до скольких переменных сверять ответ с полным перебором, дальше - на согласованность")
+    parser.add_argument('--no-cache', action='store_true', help="отключить кэш Solver")
+    parser.add_argument('--backend', choices=Solver.BACKENDS, default='auto', help="способ решения")
+    parser.add_argument('-o', '--output', default='-', help="файл JSONL с замерами, '-' - stdout")
+    parser.add_argument('--baseline', help="JSONL прошлого прогона для сравнения")
+    args = parser.parse_args(argv)
+
+    if args.no_cache:
+        Solver.cache = None
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    records = []
+    try:
+        for task in make_tasks(args.seed, args.tasks, args.min_vars, args.max_vars, args.repeat_share):
+            record = run_task(task, args.exact_max_vars, args.backend)
+            records.append(record)
+            target.write(json.dumps(record) + '\n')
+    finally:
+        if target is not sys.stdout:
+            target.close()
+
+    summarize(records, sys.stderr)
+    if Solver.cache is not None:
+        print(f"Кэш: {Solver.cache.info()}", file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            compare([json.loads(line) for line in f if line.strip()], records, sys.stderr)
+    failed = sum(not r['ok'] for r in records)
+    if failed:
+        print(f"Расхождений с исходной реализацией: {failed}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Долгоживущий сервер Solver: JSON-RPC 2.0 поверх Unix-сокета или stdin/stdout.
+
+Скрипту проверки не нужно каждый раз запускать интерпретатор, разбирать формулу и строить таблицу:
+сервер держит процессы-решатели с прогретым кэшем Solver (таблицы, индексы строк, ответы)
+и свой кэш готовых ответов. Запросы, пришедшие почти одновременно, собираются в пачку,
+одинаковые решаются один раз, пачка делится между процессами пула - цикл asyncio не занят поиском.
+
+Сообщения - JSON по одному в строке (можно массивом, как пакет JSON-RPC). Методы:
+    solve    {"func": ..., "table": [...], "variables": null | "auto" | [...], "backend": "auto"}
+             -> {"answer": "zyxw", "order": [...], "rows": [...]} или {"answer": null} или {"error": "..."}
+    metrics  -> число запросов, попадания в кэш, размеры пачек, задержки (мс)
+    ping     -> "pong"
+
+Запуск:  python solver_daemon.py --socket /tmp/solver.sock -j 4
+         python solver_daemon.py            (stdin/stdout)
+Клиент:  call('/tmp/solver.sock', 'solve', func="x and y", table=[[1, None, 1]])
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import statistics
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from bulk_solver import solve_task
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+
+
+class MethodNotFound(LookupError):
+    """Запрошен неизвестный метод JSON-RPC"""
+
+
+def solve_batch(tasks):
+    """Решает пачку задач в процессе пула; кэш Solver в процессе сохраняется между пачками"""
+    return [solve_task(task) for task in tasks]
+
+
+class Metrics:
+    def __init__(self, window=1000):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.batches = 0
+        self.batched_tasks = 0
+        self.latencies = deque(maxlen=window)
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else None
+
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'uptime': time.monotonic() - self.started,
+            'requests': self.requests,
+            'errors': self.errors,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_hit_rate': self.cache_hits / lookups if lookups else None,
+            'batches': self.batches,
+            'mean_batch': self.batched_tasks / self.batches if self.batches else None,
+            'latency_ms': {
+                'mean': statistics.fmean(latencies) * 1000 if latencies else None,
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': latencies[-1] * 1000 if latencies else None,
+            },
+        }
+
+
+class SolverDaemon:
+    # сколько ждать остальные запросы пачки после первого, с
+    BATCH_WINDOW = 0.002
+    MAX_BATCH = 256
+
+    def __init__(self, processes=None, cache_size=4096):
+        self.processes = processes or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(self.processes)
+        self.answers = OrderedDict()
+        self.cache_size = cache_size
+        self.queue = asyncio.Queue()
+        self.metrics = Metrics()
+        self.batcher = None
+        # пачки в работе: без ссылки на задачу её может собрать сборщик мусора до завершения
+        self.batch_tasks = set()
+
+    def start(self):
+        self.batcher = asyncio.create_task(self._batch_loop())
+
+    async def close(self):
+        if self.batcher is not None:
+            self.batcher.cancel()
+        for task in self.batch_tasks:
+            task.cancel()
+        # ожидание процессов заняло бы цикл asyncio: по SIGTERM сервер бы не завершился
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _key(task):
+        return json.dumps([task['func'], task['table'], task.get('variables'), task.get('backend', 'auto')])
+
+    async def solve(self, task):
+        if not isinstance(task.get('func'), str) or not isinstance(task.get('table'), list):
+            raise TypeError("нужны параметры func (строка) и table (список строк)")
+        key = self._key(task)
+        answer = self.answers.get(key)
+        if answer is not None:
+            self.answers.move_to_end(key)
+            self.metrics.cache_hits += 1
+            return answer
+        self.metrics.cache_misses += 1
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((key, task, future))
+        return await future
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.BATCH_WINDOW
+            while len(batch) < self.MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.metrics.batches += 1
+            self.metrics.batched_tasks += len(batch)
+            task = asyncio.create_task(self._run_batch(batch))
+            self.batch_tasks.add(task)
+            task.add_done_callback(self.batch_tasks.discard)
+
+    async def _run_batch(self, batch):
+        # одинаковые задачи пачки решаются один раз
+        waiting = OrderedDict()
+        for key, task, future in batch:
+            waiting.setdefault(key, (task, []))[1].append(future)
+        keys = list(waiting)
+        size = -(-len(keys) // self.processes)
+        chunks = [keys[i:i + size] for i in range(0, len(keys), size)]
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self.pool, solve_batch, [waiting[key][0] for key in chunk]) for chunk in chunks),
+            return_exceptions=True)
+        for chunk, answers in zip(chunks, results):
+            for number, key in enumerate(chunk):
+                futures = waiting[key][1]
+                if isinstance(answers, BaseException):
+                    answer = {'error': f"{type(answers).__name__}: {answers}"}
+                else:
+                    answer = answers[number]
+                    if 'error' not in answer:
+                        self._remember(key, answer)
+                for future in futures:
+                    if not future.done():
+                        future.set_result(answer)
+
+    def _remember(self, key, answer):
+        self.answers[key] = answer
+        self.answers.move_to_end(key)
+        if len(self.answers) > self.cache_size:
+            self.answers.popitem(last=False)
+
+    async def call(self, method, params):
+        if method == 'solve':
+            if not isinstance(params, dict):
+                raise TypeError("параметры solve передаются объектом")
+            return await self.solve(params)
+        if method == 'metrics':
+            return self.metrics.snapshot()
+        if method == 'ping':
+            return 'pong'
+        raise MethodNotFound(method)
+
+    async def handle(self, message):
+        """Ответ на один запрос JSON-RPC; None - для уведомлений (без id)"""
+        start = time.perf_counter()
+        self.metrics.requests += 1
+        if not isinstance(message, dict) or message.get('jsonrpc') != '2.0' or not isinstance(message.get('method'), str):
+            self.metrics.errors += 1
+            return _error(None, INVALID_REQUEST, "Неверный запрос")
+        request_id = message.get('id')
+        try:
+            reply = {'jsonrpc': '2.0', 'id': request_id,
+                     'result': await self.call(message['method'], message.get('params', {}))}
+        except MethodNotFound:
+            self.metrics.errors += 1
+            reply = _error(request_id, METHOD_NOT_FOUND, f"Нет метода {message['method']!r}")
+        except (TypeError, KeyError) as e:
+            self.metrics.errors += 1
+            reply = _error(request_id, INVALID_PARAMS, str(e))
+        self.metrics.latencies.append(time.perf_counter() - start)
+        # уведомлениям (без id) ответ не посылается
+        return reply if 'id' in message else None
+
+    async def handle_line(self, line):
+        """Строка запроса (один запрос или пакет) -> строка ответа или None"""
+        try:
+            message = json.loads(line)
+        except ValueError:
+            self.metrics.errors += 1
+            return json.dumps(_error(None, PARSE_ERROR, "Ошибка разбора JSON"), ensure_ascii=False)
+        if isinstance(message, list):
+            if not message:
+                return json.dumps(_error(None, INVALID_REQUEST, "Пустой пакет"), ensure_ascii=False)
+            replies = [reply for reply in await asyncio.gather(*map(self.handle, message)) if reply is not None]
+            return json.dumps(replies, ensure_ascii=False) if replies else None
+        reply = await self.handle(message)
+        return None if reply is None else json.dumps(reply, ensure_ascii=False)
+
+    async def serve_stream(self, reader, writer):
+        """Обслуживает одно соединение; запросы выполняются параллельно, ответы пишутся по готовности"""
+        lock = asyncio.Lock()
+
+        async def respond(line):
+            reply = await self.handle_line(line)
+            if reply is not None:
+                async with lock:
+                    writer.write(reply.encode('utf-8') + b'\n')
+                    await writer.drain()
+
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(respond(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+
+def _error(request_id, code, message):
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+
+async def serve_socket(daemon, path):
+    if os.path.exists(path):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(daemon.serve_stream, path)
+    print(f"Сервер слушает {path}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        os.unlink(path)
+
+
+class _StdioStream:
+    """stdin/stdout с интерфейсом StreamReader/StreamWriter; подходит и для файлов, и для каналов"""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+
+    async def readline(self):
+        # чтение в отдельном потоке: stdin может быть файлом, с которым asyncio не работает
+        return await self.loop.run_in_executor(None, sys.stdin.buffer.readline)
+
+    def write(self, data):
+        sys.stdout.buffer.write(data)
+
+    async def drain(self):
+        sys.stdout.buffer.flush()
+
+    def close(self):
+        sys.stdout.buffer.flush()
+
+
+async def serve_stdio(daemon):
+    stream = _StdioStream()
+    await daemon.serve_stream(stream, stream)
+
+
+async def main_async(args):
+    # по SIGTERM сервер останавливается штатно и закрывает пул, процессы пула не остаются висеть
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, main_task.cancel)
+    daemon = SolverDaemon(args.processes, args.cache_size)
+    daemon.start()
+    try:
+        if args.socket:
+            await serve_socket(daemon, args.socket)
+        else:
+            await serve_stdio(daemon)
+    finally:
+        await daemon.close()
+
+
+def call(path, method, **params):
+    """Синхронный вызов метода сервера по Unix-сокету - для коротких скриптов"""
+    request = {'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as stream:
+            reply = json.loads(stream.readline())
+    if 'error' in reply:
+        raise RuntimeError(reply['error']['message'])
+    return reply['result']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер Solver (JSON-RPC) с прогретыми кэшами")
+    parser.add_argument('--socket', help="путь Unix-сокета; без него - stdin/stdout")
+    parser.add_argument('-j', '--processes', type=int, default=None, help="число процессов (по умолчанию - все ядра)")
+    parser.add_argument('--cache-size', type=int, default=4096, help="сколько готовых ответов хранить")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(main_async(args))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Потоковая выгрузка таблицы истинности без построения списка строк.
+
+Таблица считается блоками по chunk_rows строк: в блоке старшие переменные постоянны,
+младшие - маски блока, формула (formula.compile_formula) вычисляется на них сразу для всего блока.
+Память не зависит от числа переменных - только от размера блока.
+
+Форматы:
+    csv  - заголовок "x,y,z,w,F" и строки "0,1,1,0,1";
+    bin  - упакованный: заголовок, имена переменных и столбец F по биту на строку.
+           Клетки переменных в файл не пишутся: это биты номера строки (первая переменная - старший бит).
+
+Двоичный файл: HEADER (magic, версия, число переменных, длина имён, crc32 данных),
+имена через запятую в UTF-8, выравнивание нулями до 8 байт, затем данные - 2 ** n бит,
+строка r - бит r % 8 байта r // 8 (как int.to_bytes(..., 'little') у упакованного столбца Solver).
+Читается через mmap: TableFile.
+
+Пример: python table_export.py "(x ∧ y) ∨ z" -o table.bin --variables auto
+        python table_export.py "(x ∧ y) ∨ z" -o table.csv --format csv
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+from formula import parse, compile_formula, iter_blocks, row_values, CHUNK_ROWS
+
+MAGIC = b'TTABLE\0\0'
+VERSION = 1
+HEADER = struct.Struct('<8sHHII')  # magic, версия, число переменных, длина имён, crc32 данных
+ALIGN = 8
+
+
+class TableFileError(ValueError):
+    """Файл таблицы повреждён или другой версии"""
+
+
+def iter_chunks(tree, variables, chunk_rows=CHUNK_ROWS):
+    """
+    Столбец F блоками: пары (номер первой строки, число строк, упакованный столбец F блока).
+    :param chunk_rows: строк в блоке, степень двойки
+    """
+    evaluate = compile_formula(tree, variables)
+    for first, values, full in iter_blocks(len(variables), chunk_rows):
+        yield first, full.bit_length(), evaluate(values, full)
+
+
+def export_csv(tree, variables, target, chunk_rows=CHUNK_ROWS):
+    """Пишет таблицу в текстовый поток target в CSV"""
+    n = len(variables)
+    target.write(','.join(list(variables) + ['F']) + '\n')
+    low_parts = None
+    for first, size, packed in iter_chunks(tree, variables, chunk_rows):
+        low = size.bit_length() - 1
+        if low_parts is None:
+            # клетки младших переменных одинаковы во всех блоках
+            low_parts = [''.join(f'{(i >> (low - 1 - k)) & 1},' for k in range(low)) for i in range(size)]
+        high = first >> low
+        prefix = ''.join(f'{(high >> (n - low - 1 - k)) & 1},' for k in range(n - low))
+        # биты F блока строкой: символ i - строка first + i
+        bits = format(packed, f'0{size}b')[::-1]
+        target.write(''.join(f'{prefix}{part}{f}\n' for part, f in zip(low_parts, bits)))
+
+
+def export_binary(tree, variables, target, chunk_rows=CHUNK_ROWS):
+    """Пишет таблицу в двоичный поток target (нужен seek: crc32 дописывается в заголовок в конце)"""
+    names = ','.join(variables).encode('utf-8')
+    start = target.tell()
+    target.write(HEADER.pack(MAGIC, VERSION, len(variables), len(names), 0))
+    target.write(names)
+    target.write(b'\0' * (-(HEADER.size + len(names)) % ALIGN))
+    crc = 0
+    for first, size, packed in iter_chunks(tree, variables, max(chunk_rows, 8)):
+        data = packed.to_bytes((size + 7) // 8, 'little')
+        crc = zlib.crc32(data, crc)
+        target.write(data)
+    end = target.tell()
+    target.seek(start)
+    target.write(HEADER.pack(MAGIC, VERSION, len(variables), len(names), crc))
+    target.seek(end)
+
+
+def export(tree, variables, path, binary=True, chunk_rows=CHUNK_ROWS):
+    """Выгружает таблицу формулы (дерево из formula.parse) в файл: двоичный или CSV"""
+    if binary:
+        with open(path, 'wb') as f:
+            export_binary(tree, variables, f, chunk_rows)
+    else:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            export_csv(tree, variables, f, chunk_rows)
+
+
+class TableFile:
+    """Двоичная таблица через mmap: строки читаются по требованию, файл целиком в память не грузится"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            # пустой файл mmap не отображает (ValueError) - проверяем размер заранее
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise TableFileError("Файл таблицы слишком короткий")
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._check()
+        except TableFileError:
+            self.data.close()
+            raise
+
+    def _check(self):
+        magic, version, n, names_length, self.checksum = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise TableFileError(f"Неподходящий файл таблицы: {magic!r}, версия {version}")
+        try:
+            names = bytes(self.data[HEADER.size:HEADER.size + names_length]).decode('utf-8')
+        except UnicodeDecodeError:
+            raise TableFileError("Имена переменных - не UTF-8") from None
+        self.variables = tuple(names.split(',')) if names else ()
+        if len(self.variables) != n:
+            raise TableFileError("Число имён переменных не совпадает с заголовком")
+        self.base = HEADER.size + names_length
+        self.base += -self.base % ALIGN
+        self.rows = 1 << n
+        if len(self.data) != self.base + (self.rows + 7) // 8:
+            raise TableFileError("Размер файла таблицы не совпадает с заголовком")
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.rows
+
+    def value(self, r):
+        """Значение F в строке r"""
+        if not 0 <= r < self.rows:
+            raise IndexError(r)
+        return (self.data[self.base + (r >> 3)] >> (r & 7)) & 1
+
+    def row(self, r):
+        """Строка таблицы как в Solver.create_whole_table: значения переменных и F"""
+        return row_values(r, len(self.variables)) + [self.value(r)]
+
+    def packed(self, start=0, stop=None):
+        """Столбец F строк [start, stop) одним числом, бит i - строка start + i"""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        if start >= stop:
+            return 0
+        first, last = start >> 3, (stop + 7) >> 3
+        value = int.from_bytes(self.data[self.base + first:self.base + last], 'little')
+        return (value >> (start & 7)) & ((1 << (stop - start)) - 1)
+
+    def verify(self):
+        """Сверяет crc32 данных с заголовком"""
+        return zlib.crc32(memoryview(self.data)[self.base:]) == self.checksum
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Потоковая выгрузка таблицы истинности")
+    parser.add_argument('func', help="формула")
+    parser.add_argument('-o', '--output', required=True, help="файл результата")
+    parser.add_argument('--format', choices=('bin', 'csv'), default='bin')
+    parser.add_argument('--variables', default=None,
+                        help="'auto' или имена через запятую (по умолчанию x,y,z,w)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="строк в блоке, степень двойки")
+    args = parser.parse_args(argv)
+    try:
+        tree = parse(args.func)
+        if args.variables is None:
+            variables = ('x', 'y', 'z', 'w')
+        elif args.variables == 'auto':
+            # порядок переменных - как у Solver(..., variables="auto"); solver сам импортирует этот модуль
+            from solver import find_variables
+            variables = find_variables(tree)
+        else:
+            variables = args.variables.split(',')
+        export(tree, variables, args.output, args.format == 'bin', args.chunk_rows)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()